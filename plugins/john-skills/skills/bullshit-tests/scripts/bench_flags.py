@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""bench_flags.py — benchmark ledger.py's flag scanner on a synthetic corpus.
+
+Generates N synthetic test bodies across the five supported languages (ordinary
+setup lines, a few assertions, and a sprinkling of every mechanical-flag pattern),
+then times two ways of triaging them:
+
+  per-rule   the pre-scanner approach: every BASELINE_RULES regex (the untagged
+             rules as they were before language tagging) searched separately,
+             plus a findall for assertions and a splitlines pass for the
+             empty-body check
+  scanner    ledger._flags: one combined, per-language-pruned pass per body
+
+The scanner must agree exactly with ledger.FLAG_RULES' own alternatives searched
+one rule at a time. Against the untagged baseline it may only drop flags, where
+a rule matched through another language's alternative; those are listed by
+language and rule. Any other difference is a failure.
+
+    python3 bench_flags.py                 # 100k tests
+    python3 bench_flags.py -n 20000 --seed 7
+
+Stdlib only. Python 3.9+.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import ledger  # noqa: E402
+
+FILLER = {
+    "py":   ["x = make_thing({n})", "result = svc.run(x, retries={n})",
+             "items = [i * {n} for i in range(10)]", "# setup for case {n}",
+             "with open(path) as fh:", "    data = fh.read()"],
+    "js":   ["const x = makeThing({n});", "let result = svc.run(x, {{ retries: {n} }});",
+             "// setup for case {n}", "const items = [1, 2, 3].map(i => i * {n});",
+             "await page.goto('/item/{n}');"],
+    "go":   ["x := makeThing({n})", "result, err := svc.Run(x, {n})",
+             "// setup for case {n}", "items := []int{{1, 2, {n}}}"],
+    "rb":   ["x = make_thing({n})", "result = svc.run(x, retries: {n})",
+             "# setup for case {n}", "items = [1, 2, 3].map {{ |i| i * {n} }}"],
+    "rust": ["let x = make_thing({n});", "let result = svc.run(&x, {n});",
+             "// setup for case {n}", "let items: Vec<i32> = (0..{n}).collect();"],
+}
+ASSERTS = {
+    "py":   ["assert result == {n}", "self.assertEqual(result, {n})",
+             "with pytest.raises(ValueError):", "mock.assert_called_once_with({n})"],
+    "js":   ["expect(result).toBe({n});", "assert.equal(result, {n});",
+             "expect(items).toHaveLength({n});"],
+    "go":   ["if result != {n} {{ t.Errorf(\"got %v\", result) }}",
+             "assert.Equal(t, {n}, result)", "require.NoError(t, err)"],
+    "rb":   ["expect(result).to eq({n})", "assert_equal {n}, result",
+             "result.must_equal {n}"],
+    "rust": ["assert_eq!(result, {n});", "assert!(items.len() > {n});"],
+}
+SMELLS = {
+    "py":   ["assert True", "self.assertTrue(True)", "with pytest.raises(Exception):",
+             "try:\n        run()\n    except Exception: pass", "src = p.read_text()",
+             "ok = cfg.get('enabled', True)", "@pytest.mark.skip",
+             "blob = zipfile.ZipFile.read(zf, name)"],
+    "js":   ["expect(true).toBe(true);", "it.skip('later', () => {});",
+             "expect(fn).toThrow();", "try { run(); } catch (e) {}",
+             "expect(p).resolves.toBe(1);", "const src = fs.readFileSync(f);",
+             "const ok = flag || true;"],
+    "go":   ["t.Skip(\"flaky\")", "assert.True(t, ok, true)", "b, _ := os.ReadFile(f)"],
+    "rb":   ["pending 'later'", "expect { run }.to raise_error",
+             "src = File.read(path)", "ok = flag || true"],
+    "rust": ["assert!(true);", "let src = include_str!(\"x.rs\");",
+             "let idle = future::pending();"],
+}
+HEAD = {
+    "py": "def test_case_{n}(self):", "js": "it('case {n}', async () => {{",
+    "go": "func TestCase{n}(t *testing.T) {{", "rb": "it 'case {n}' do",
+    "rust": "fn case_{n}() {{",
+}
+TAIL = {"py": None, "js": "});", "go": "}", "rb": "end", "rust": "}"}
+# whole tests on one line, asserting on the header line itself
+ONE_LINE = {
+    "py": "def test_case_{n}(self): assert run() == {n}",
+    "js": "it('case {n}', () => expect(run()).toBe({n}));",
+    "go": "func TestCase{n}(t *testing.T) {{ assert.Equal(t, {n}, run()) }}",
+    "rb": "it('case {n}') {{ expect(run).to eq({n}) }}",
+    "rust": "fn case_{n}() {{ assert_eq!(run(), {n}); }}",
+}
+
+# FLAG_RULES before alternatives were tagged by language: every rule's regex ran
+# on every language.
+BASELINE_RULES = {
+    "tautology":      r"assert\s+True\b|assert\s+1\s*==\s*1\b"
+                      r"|assertTrue\(\s*True\s*\)"
+                      r"|expect\(\s*(?:true|1)\s*\)\.(?:toBe|toEqual)\(\s*(?:true|1)\s*\)"
+                      r"|assert!\(\s*true\s*\)|assert_eq!\(\s*true\s*,\s*true\s*\)"
+                      r"|(?:assert|require)\.(?:True|Equal)\([^,]+,\s*true\b",
+    "skip_or_xfail":  r"@(?:pytest\.mark\.)?(?:skip|xfail)\b|@unittest\.skip"
+                      r"|\bit\.skip\b|\bxit\b|\bit\.todo\b|\bdescribe\.skip\b"
+                      r"|\bt\.Skipf?\(|\bpending\(|\bpending[ \t]+['\"]|\bpending[ \t]+do\b",
+    "only":           r"\bit\.only\b|\btest\.only\b|\bdescribe\.only\b",
+    "broad_raises":   r"pytest\.raises\(\s*Exception\s*\)"
+                      r"|assertRaises\(\s*Exception\b"
+                      r"|\.toThrow\(\s*\)"
+                      r"|raise_error(?!\s*[\(A-Za-z:])",
+    "swallowed":      r"except\s*\(?\s*(?:Exception|AssertionError|BaseException)"
+                      r"[^)]*\)?\s*:\s*(?:pass|continue)"
+                      r"|catch\s*\([^)]*\)\s*\{\s*\}",
+    "source_text":    r"readFileSync|\.read_text\(\)|ioutil\.ReadFile|os\.ReadFile"
+                      r"|File\.read\b|include_str!",
+    "unawaited_async": r"(?<!await\s)(?<!return\s)expect\([^)]*\)\.(?:resolves|rejects)",
+    "default_truth":  r"except[^:]*:\s*return\s+True|\bor\s+True\b|\|\|\s*true\b"
+                      r"|\.get\([^)]+,\s*True\)",
+}
+
+
+def corpus(n, seed):
+    rnd = random.Random(seed)
+    langs = list(HEAD)
+    out = []
+    for i in range(n):
+        lang = rnd.choice(langs)
+        lines = [HEAD[lang].format(n=i)]
+        num = lambda: rnd.randint(0, 999)  # noqa: E731
+        body = [rnd.choice(FILLER[lang]).format(n=num()) for _ in range(rnd.randint(2, 14))]
+        body += [rnd.choice(ASSERTS[lang]).format(n=num())
+                 for _ in range(rnd.choice((0, 1, 1, 2, 3)))]
+        if rnd.random() < 0.15:
+            body.insert(rnd.randrange(len(body) + 1), rnd.choice(SMELLS[lang]))
+        if rnd.random() < 0.01:
+            body = ["pass" if lang == "py" else ""]
+        if rnd.random() < 0.01:
+            out.append((lang, ONE_LINE[lang].format(n=i)))
+            continue
+        lines += ["    " + l for l in body]
+        if TAIL[lang]:
+            lines.append(TAIL[lang])
+        out.append((lang, "\n".join(lines)))
+    return out
+
+
+def _per_rule(bodies, rules_for):
+    out = []
+    for lang, body in bodies:
+        n_assert = len(ledger.ASSERTS[lang].findall(body))
+        flags = [name for name, rx in rules_for(lang).items() if rx.search(body)]
+        if n_assert == 0:
+            flags.append("no_assert")
+        stripped = "\n".join(l for l in body.splitlines()[1:] if l.strip())
+        if not stripped or re.fullmatch(r"\s*(?:pass|\.\.\.|\{\s*\}|end|return)\s*", stripped):
+            flags.append("empty_body")
+        if "source_text" in flags and n_assert == 0:
+            flags.remove("source_text")
+        out.append((n_assert, sorted(flags)))
+    return out
+
+
+def per_rule(bodies):
+    """The original triage: each rule's full cross-language regex on its own."""
+    rules = {name: re.compile(pat) for name, pat in BASELINE_RULES.items()}
+    return _per_rule(bodies, lambda lang: rules)
+
+
+def tagged(bodies):
+    """The per-rule triage over each language's own FLAG_RULES alternatives."""
+    rules = {lang: {name: re.compile("|".join(pat for langs, _, pat in alts
+                                                if lang in langs.split()))
+                    for name, alts in ledger.FLAG_RULES.items()
+                    if alts and any(lang in langs.split() for langs, _, _ in alts)}
+             for lang in ledger.ASSERTS}
+    return _per_rule(bodies, rules.get)
+
+
+def scanner(bodies):
+    return [ledger._flags(body, lang, []) for lang, body in bodies]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("-n", type=int, default=100_000, help="number of synthetic tests")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    bodies = corpus(args.n, args.seed)
+    size = sum(len(b) for _, b in bodies)
+    print(f"corpus: {args.n} tests, {size / 1e6:.1f} MB of test bodies")
+    results = {}
+    for label, fn in (("per-rule", per_rule), ("scanner", scanner)):
+        t0 = time.perf_counter()
+        results[label] = fn(bodies)
+        dt = time.perf_counter() - t0
+        print(f"{label:9} {dt:6.2f}s  {args.n / dt:9,.0f} tests/s")
+    diff = sum(a != b for a, b in zip(tagged(bodies), results["scanner"]))
+    print(f"mismatches against the tagged rules: {diff}")
+
+    # Against the untagged baseline, only flags another language's alternative
+    # raised may go; count them so the list of dropped cross-language hits is explicit
+    dropped, other = {}, 0
+    for (lang, _), (n0, f0), (n1, f1) in zip(bodies, results["per-rule"], results["scanner"]):
+        if n0 != n1 or set(f1) - set(f0):
+            other += 1
+        for name in sorted(set(f0) - set(f1)):
+            dropped[lang, name] = dropped.get((lang, name), 0) + 1
+    for (lang, name), count in sorted(dropped.items()):
+        print(f"  dropped vs untagged baseline: {lang:4} {name:14} {count:6,}")
+    print(f"other differences from the untagged baseline: {other}")
+    sys.exit(1 if diff or other else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,15 +10,28 @@ judgment is actually needed — and can stop, resume, or fan out to subagents
 without losing its place.
 
 The ledger lives in scratch space, never in the audited repo. It reads test files;
-it never writes to them.
+it never writes to them. (`verify` runs tests, but only in a throwaway copy.)
 
 Subcommands
 -----------
-  build   enumerate tests → JSONL ledger, with assertion counts + mechanical flags
+  build   enumerate tests → ledger, with assertion counts + mechanical flags
+          (--update: rescan only changed files, keep verdicts on unchanged tests;
+           --parser ast: enumerate Python with the stdlib ast instead of regexes)
   stats   counts by status / priority / flag; the pending count is your progress bar
   next    emit the next N rows needing a human-judgment read (compact, for the agent)
+          (--claim --worker W: lease them to W so parallel workers draw disjoint batches)
   set     update one row's verdict in place (status, pattern, severity, evidence, story)
+  apply   record a whole JSONL file of verdicts in one write (same rules as `set`)
   report  emit a markdown verdict summary generated FROM the ledger (for the report)
+          (--out-dir: index + one shard per directory; --since REV: only newer verdicts)
+  convert import a .jsonl ledger into SQLite, or export one back to .jsonl
+  coverage  ingest per-test coverage (.coverage / lcov); `next` then serves tests
+          that cover nothing, or nothing no other test covers, first
+  verify  mutate the code a red/yellow verdict rests on (in a temp copy of the repo)
+          and rerun just that test: survives every mutant → confirmed, fails → refuted
+
+Ledger format follows the extension: `.jsonl` is a plain file rewritten on every
+write; `.db` is SQLite with indexed point updates, for suites in the thousands.
 
 A row can never reach status red/yellow without an `evidence` (file:line) and a
 `story` — the tool refuses it. That is the structural check on fabrication: every
@@ -29,11 +42,33 @@ Stdlib only. Python 3.9+.
 from __future__ import annotations
 
 import argparse
+import ast
+import bisect
+import hashlib
+import itertools
 import json
+import multiprocessing
+import os
+import posixpath
+import random
 import re
+import shlex
+import shutil
+import sqlite3
+import subprocess
 import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:       # Windows: no flock; run one writer at a time there
+    fcntl = None
+
+
 # --------------------------------------------------------------------------- #
 # Enumeration
 # --------------------------------------------------------------------------- #
@@ -75,41 +110,107 @@ ASSERT_RB = re.compile(r"\bexpect\(|\bis_expected\b|\.to\b|\.to_not\b|\.not_to\b
 ASSERT_RUST = re.compile(r"\bassert(?:_eq|_ne)?!|\bdebug_assert(?:_eq|_ne)?!|\bpanic!")
 ASSERTS = {"py": ASSERT_PY, "js": ASSERT_JS, "go": ASSERT_GO,
            "rb": ASSERT_RB, "rust": ASSERT_RUST}
+# Every character an assertion token can start with, per language (see _Scanner).
+ASSERT_STARTS = {"py": "aspn.", "js": "eact.", "go": "tars", "rb": "eiar.", "rust": "adp"}
 
 # Mechanical flags — the greppable patterns a linter could also catch. The tool
 # raises these as *candidates*; the LLM still adjudicates (an assertion can hide
 # in a helper), but every flagged row is guaranteed to get a human-judgment look.
-# The regexes span languages; a rule that can't match a given language is simply
-# inert there. Language-specific structural signals (rust #[should_panic]/#[ignore],
-# js .only/.skip modifiers) are added as `extra` flags at detection time.
+# Each rule is a set of (languages, start characters, regex) alternatives; a
+# language's scanner (below) is compiled from only its own alternatives, so a
+# rule that can't match there costs nothing. The start characters are every
+# character a match of that regex can begin with — keep them in step when
+# editing a regex, or the scanner skips past its matches. Language-specific
+# structural signals (rust #[should_panic]/#[ignore], js .only/.skip modifiers)
+# are added as `extra` flags at detection time.
 FLAG_RULES = {
     "no_assert":      None,  # computed from assertion count, below
-    "tautology":      re.compile(r"assert\s+True\b|assert\s+1\s*==\s*1\b"
-                                 r"|assertTrue\(\s*True\s*\)"
-                                 r"|expect\(\s*(?:true|1)\s*\)\.(?:toBe|toEqual)\(\s*(?:true|1)\s*\)"
-                                 r"|assert!\(\s*true\s*\)|assert_eq!\(\s*true\s*,\s*true\s*\)"
-                                 r"|(?:assert|require)\.(?:True|Equal)\([^,]+,\s*true\b"),
+    "tautology":      (("py",   "a",  r"assert\s+True\b|assert\s+1\s*==\s*1\b"
+                                      r"|assertTrue\(\s*True\s*\)"),
+                       ("js",   "e",  r"expect\(\s*(?:true|1)\s*\)\.(?:toBe|toEqual)\(\s*(?:true|1)\s*\)"),
+                       ("rust", "a",  r"assert!\(\s*true\s*\)|assert_eq!\(\s*true\s*,\s*true\s*\)"),
+                       ("go",   "ar", r"(?:assert|require)\.(?:True|Equal)\([^,]+,\s*true\b")),
     # Deliberately NOT a bare `\bskip\b`/`\bpending\b`: those are domain words
     # (a "pending request", a conditional `pytest.skip("no moto")` guard) and
     # flag half a real codebase. Match only the marker forms.
-    "skip_or_xfail":  re.compile(r"@(?:pytest\.mark\.)?(?:skip|xfail)\b|@unittest\.skip"
-                                 r"|\bit\.skip\b|\bxit\b|\bit\.todo\b|\bdescribe\.skip\b"
-                                 r"|\bt\.Skipf?\(|\bpending\(|\bpending[ \t]+['\"]|\bpending[ \t]+do\b"),
-    "only":           re.compile(r"\bit\.only\b|\btest\.only\b|\bdescribe\.only\b"),
+    "skip_or_xfail":  (("py",    "@",   r"@(?:pytest\.mark\.)?(?:skip|xfail)\b|@unittest\.skip"),
+                       ("js",    "id",  r"\bit\.skip\b|\bit\.todo\b|\bdescribe\.skip\b"),
+                       ("js rb", "xp",  r"\bxit\b|\bpending\("),
+                       ("go",    "t",   r"\bt\.Skipf?\("),
+                       ("rb",    "p",   r"\bpending[ \t]+['\"]|\bpending[ \t]+do\b")),
+    "only":           (("js",   "itd", r"\bit\.only\b|\btest\.only\b|\bdescribe\.only\b"),),
     "empty_body":     None,  # computed from body, below
-    "broad_raises":   re.compile(r"pytest\.raises\(\s*Exception\s*\)"
-                                 r"|assertRaises\(\s*Exception\b"
-                                 r"|\.toThrow\(\s*\)"
-                                 r"|raise_error(?!\s*[\(A-Za-z:])"),
-    "swallowed":      re.compile(r"except\s*\(?\s*(?:Exception|AssertionError|BaseException)"
-                                 r"[^)]*\)?\s*:\s*(?:pass|continue)"
-                                 r"|catch\s*\([^)]*\)\s*\{\s*\}"),
-    "source_text":    re.compile(r"readFileSync|\.read_text\(\)|ioutil\.ReadFile|os\.ReadFile"
-                                 r"|File\.read\b|include_str!"),
-    "unawaited_async": re.compile(r"(?<!await\s)(?<!return\s)expect\([^)]*\)\.(?:resolves|rejects)"),
-    "default_truth":  re.compile(r"except[^:]*:\s*return\s+True|\bor\s+True\b|\|\|\s*true\b"
-                                 r"|\.get\([^)]+,\s*True\)"),
+    "broad_raises":   (("py",   "pa", r"pytest\.raises\(\s*Exception\s*\)"
+                                      r"|assertRaises\(\s*Exception\b"),
+                       ("js",   ".",  r"\.toThrow\(\s*\)"),
+                       ("rb",   "r",  r"raise_error(?!\s*[\(A-Za-z:])")),
+    "swallowed":      (("py",   "e",  r"except\s*\(?\s*(?:Exception|AssertionError|BaseException)"
+                                      r"[^)]*\)?\s*:\s*(?:pass|continue)"),
+                       ("js",   "c",  r"catch\s*\([^)]*\)\s*\{\s*\}")),
+    "source_text":    (("js",   "r",  r"readFileSync"),
+                       ("py",   ".",  r"\.read_text\(\)"),
+                       ("go",   "io", r"ioutil\.ReadFile|os\.ReadFile"),
+                       ("rb",   "F",  r"File\.read\b"),
+                       ("rust", "i",  r"include_str!")),
+    "unawaited_async": (("js",  "e",  r"(?<!await\s)(?<!return\s)expect\([^)]*\)\.(?:resolves|rejects)"),),
+    "default_truth":  (("py",   "eo.", r"except[^:]*:\s*return\s+True|\bor\s+True\b"
+                                       r"|\.get\([^)]+,\s*True\)"),
+                       ("js go rb rust", "|", r"\|\|\s*true\b")),
 }
+EMPTY_REST = re.compile(r"\s*(?:(?:pass|\.\.\.|\{\s*\}|end|return)\s*)?")
+
+
+class _Scanner:
+    """One language's assertion counter and flag detector, run as a single pass.
+
+    Every assertion token and every flag alternative for the language is folded
+    into one zero-width lookahead alternation, so `finditer` stops only at the
+    offsets where *something* could match — one traversal of the body in C. At
+    each stop the few rules still unresolved are tried with an anchored `.match`,
+    so overlapping hits (`assert True` is both an assertion and a tautology) all
+    count. Assertions are counted non-overlapping, exactly as `findall` would."""
+
+    def __init__(self, lang):
+        self.arx = ASSERTS[lang]
+        self.rules = {}
+        starts = set(ASSERT_STARTS[lang])
+        for name, alts in FLAG_RULES.items():
+            mine = [(first, pat) for langs, first, pat in alts or () if lang in langs.split()]
+            if mine:
+                self.rules[name] = re.compile("|".join(pat for _, pat in mine))
+                starts.update(*(first for first, _ in mine))
+        alts = "|".join([f"(?P<_assert>{self.arx.pattern})"]
+                        + [f"(?:{rx.pattern})" for rx in self.rules.values()])
+        # A plain character-class lookahead in front lets the regex engine skip,
+        # in one cheap test per offset, every offset no alternative can start at.
+        first = "".join(re.escape(c) for c in sorted(starts))
+        self.any = re.compile(f"(?=[{first}])(?={alts})")
+
+    def scan(self, body, pos=0, endpos=None):
+        """→ (assertion count, set of flag names hit) for body[pos:endpos]."""
+        endpos = len(body) if endpos is None else endpos
+        n_assert, free, hits = 0, pos, set()
+        todo = list(self.rules.items())
+        for m in self.any.finditer(body, pos, endpos):
+            at = m.start()
+            if m.lastgroup == "_assert" and at >= free:
+                n_assert += 1
+                free = m.end("_assert")
+            found = [t for t in todo if t[1].match(body, at, endpos)]
+            if found:
+                hits.update(name for name, _ in found)
+                todo = [t for t in todo if t[0] not in hits]
+        return n_assert, hits
+
+
+_SCANNERS = {}
+
+
+def _scanner(lang) -> _Scanner:
+    if lang not in _SCANNERS:
+        _SCANNERS[lang] = _Scanner(lang)
+    return _SCANNERS[lang]
+
 
 BODY_STOP_PY = ("#", "@", ")", "]", "}")
 INDENT_LANGS = {"py", "rb"}      # block bounded by indentation
@@ -165,29 +266,83 @@ def _iter_test_files(root: Path):
         if r: yield r
 
 
-def _py_body(lines, start):
-    indent = len(lines[start]) - len(lines[start].lstrip())
-    for j in range(start + 1, len(lines)):
-        l = lines[j]
-        if l.strip() and (len(l) - len(l.lstrip())) <= indent \
-                and not l.lstrip().startswith(BODY_STOP_PY):
-            return "\n".join(lines[start:j]), j - start
-    return "\n".join(lines[start:]), len(lines) - start
+# What the brace counter must step over: comments and string/char literals, whose
+# braces aren't structure. One alternation per language; anything that isn't a
+# brace is matched only to be skipped.
+_BRACE_TOKENS = {
+    "js":   re.compile(r"//[^\n]*|/\*.*?\*/|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'"
+                       r"|`(?:\\.|[^`\\])*`|[{}]", re.S),
+    "go":   re.compile(r"//[^\n]*|/\*.*?\*/|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'"
+                       r"|`[^`]*`|[{}]", re.S),
+    # raw strings r#"…"#; a char literal is one (escaped) char in quotes, which
+    # leaves lifetimes ('a, 'static) alone
+    "rust": re.compile(r"//[^\n]*|/\*.*?\*/|r(#*)\".*?\"\1|b?\"(?:\\.|[^\"\\])*\""
+                       r"|b?'(?:\\.|[^'\\])'|[{}]", re.S),
+}
 
 
-def _brace_body(lines, start):
-    depth, started = 0, False
-    for j in range(start, len(lines)):
-        depth += lines[j].count("{") - lines[j].count("}")
-        if "{" in lines[j]:
-            started = True
-        if started and depth <= 0:
-            return "\n".join(lines[start:j + 1]), j - start + 1
-    return "\n".join(lines[start:]), len(lines) - start
+def _indent_ends(lines, starts):
+    """End line (exclusive) of every indentation block opened at `starts`, in one
+    sweep with a stack of open blocks. A block runs until a line at or left of its
+    own indent — except comments, decorators, and closing brackets, which belong
+    to a signature or call still being written out."""
+    ends, open_ = {}, []          # open_: (indent, start), innermost last
+    starts = set(starts)
+    for j, l in enumerate(lines):
+        st = l.lstrip()
+        if st and open_ and not st.startswith(BODY_STOP_PY):
+            ind = len(l) - len(st)
+            while open_ and ind <= open_[-1][0]:
+                ends[open_.pop()[1]] = j
+        if j in starts:
+            open_.append((len(l) - len(st), j))
+    for _, s in open_:
+        ends[s] = len(lines)
+    return ends
 
 
-def _body(lines, start, lang):
-    return _py_body(lines, start) if lang in INDENT_LANGS else _brace_body(lines, start)
+def _brace_ends(text, offs, starts, lang):
+    """End line (exclusive) of every brace block opened at `starts`, in one
+    tokenizing sweep over the file. A block starts at the first `{` on or after
+    its line and ends on the line where the depth drops back to where it began;
+    braces in strings and comments don't count. A test that never opens a brace
+    (an arrow one-liner) ends where the next test starts, or where its
+    enclosing block closes."""
+    ends, open_ = {}, []          # open_: [base depth, start, started], innermost last
+    pending = sorted(starts)
+    nlines, depth, cur, k = len(offs) - 1, 0, -1, 0
+
+    def to_line(target):
+        nonlocal cur, k
+        while cur < target:
+            if cur >= 0:              # end of line `cur`: close what it finished
+                while open_ and (depth <= open_[-1][0] if open_[-1][2]
+                                 else depth < open_[-1][0]):
+                    ends[open_.pop()[1]] = cur + 1
+            cur += 1
+            if k < len(pending) and pending[k] == cur:
+                if open_ and not open_[-1][2]:
+                    ends[open_.pop()[1]] = cur
+                open_.append([depth, cur, False])
+                k += 1
+
+    for m in _BRACE_TOKENS[lang].finditer(text):
+        tok = m.group()
+        if tok not in "{}":
+            continue
+        to_line(bisect.bisect_right(offs, m.start()) - 1)
+        if tok == "{":
+            depth += 1
+            for o in reversed(open_):
+                if o[2]:
+                    break
+                o[2] = True
+        else:
+            depth -= 1
+    to_line(nlines)
+    for o in open_:
+        ends[o[1]] = nlines
+    return ends
 
 
 def _find_rust(lines):
@@ -250,21 +405,30 @@ def _find_tests(lines, lang):
         yield from _find_rust(lines)
 
 
-def _flags(body: str, n_assert: int, extra: list) -> list:
-    out = list(extra)
-    for name, rule in FLAG_RULES.items():
-        if rule is not None and rule.search(body) and name not in out:
-            out.append(name)
-    if n_assert == 0 and "no_assert" not in out:
-        out.append("no_assert")
-    stripped = "\n".join(l for l in body.splitlines()[1:] if l.strip())
-    if (not stripped or re.fullmatch(r"\s*(?:pass|\.\.\.|\{\s*\}|end|return)\s*", stripped)) \
-            and "empty_body" not in out:
-        out.append("empty_body")
+def _flags(text: str, lang: str, extra: list, pos: int = 0, endpos: int = None,
+           n_assert: int = None, head: int = None):
+    """→ (assertion count, sorted flags) for one test body: text[pos:endpos], read
+    in place — the file buffer is never sliced into per-test copies. An assertion
+    count already known from the AST overrides the token count. `head` is where
+    the header (def) line starts, if the span opens earlier, on its decorators."""
+    endpos = len(text) if endpos is None else endpos
+    head = pos if head is None else head
+    n_tokens, hits = _scanner(lang).scan(text, pos, endpos)
+    n_assert = n_tokens if n_assert is None else n_assert
+    out = set(extra) | hits
+    if n_assert == 0:
+        out.add("no_assert")
+    # everything after the header line is blank or a no-op — which includes a
+    # one-line test (an arrow function, a `def ...: assert x`), assertion or not
+    nl = text.find("\n", head, endpos)
+    if nl < 0 or nl >= endpos - 1:
+        out.add("empty_body")
+    elif EMPTY_REST.fullmatch(text, nl + 1, endpos):
+        out.add("empty_body")
     # source_text is only interesting when an assertion sits near the file read
-    if "source_text" in out and n_assert == 0:
-        out.remove("source_text")
-    return sorted(out)
+    if n_assert == 0:
+        out.discard("source_text")
+    return n_assert, sorted(out)
 
 
 def _priority(flags: list, n_assert: int) -> str:
@@ -275,44 +439,616 @@ def _priority(flags: list, n_assert: int) -> str:
     return "low"                 # likely green; sampled, not read one-by-one
 
 
+# The fields a verdict consists of (plus a live claim on the row) — what
+# `build --update` carries forward for a test whose body is unchanged, and what it
+# throws away for one that changed.
+VERDICT_FIELDS = ("status", "pattern", "severity", "evidence", "story", "verified",
+                  "verify", "propagated_from", "rev", "worker", "lease")
+
+
+def _hash(data) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8", "surrogatepass")
+    return hashlib.sha1(data).hexdigest()[:16]
+
+
+# Lines that can trail a test's last statement without being part of it: the
+# regex enumerator counts them into the test, the AST doesn't.
+BODY_TAIL = {"py": "#", "rb": "#", "js": "//", "go": "//", "rust": "//"}
+
+
+def _body_end(lines, i, end, lang) -> int:
+    """End line (exclusive) of the test at line i, cut where its last statement
+    is — the same line whichever parser found the test, so body hashes and
+    fingerprints carry across `--parser regex` and `--parser ast`. Drops a
+    decorator at or left of the def's indent (with any arguments it spans: that
+    is the next function's) and trailing blank and comment lines."""
+    if lang == "py":
+        indent = len(lines[i]) - len(lines[i].lstrip())
+        for j in range(i + 1, end):
+            st = lines[j].lstrip()
+            if st.startswith("@") and len(lines[j]) - len(st) <= indent:
+                end = j
+                break
+    while end > i + 1 and (not lines[end - 1].strip()
+                           or lines[end - 1].lstrip().startswith(BODY_TAIL[lang])):
+        end -= 1
+    return end
+
+
+# --- Python via the stdlib AST (build --parser ast) ---
+# The regex enumerator sees a test as "a `def test_` line and the indented lines
+# under it". The AST sees the real function: its decorators, a signature split over
+# lines, exact end line, every `assert` statement and assertion call, and how many
+# cases a literal @pytest.mark.parametrize table expands to.
+ASSERT_CALLS = ("raises", "warns", "fail", "deprecated_call")   # plus assert*
+
+
+def _call_name(node) -> str:
+    f = node.func
+    return f.attr if isinstance(f, ast.Attribute) else f.id if isinstance(f, ast.Name) else ""
+
+
+def _ast_asserts(fn) -> int:
+    n = 0
+    for sub in ast.walk(fn):
+        if isinstance(sub, ast.Assert):
+            n += 1
+        elif isinstance(sub, ast.Call):
+            name = _call_name(sub)
+            if name.startswith("assert") or name in ASSERT_CALLS:
+                n += 1
+    return n
+
+
+def _ast_cases(fn):
+    """Cases a test runs as: the product of its literal parametrize tables, 1 if
+    not parametrized, None if a table isn't a literal (built at import time)."""
+    n = 1
+    for d in fn.decorator_list:
+        if isinstance(d, ast.Call) and _call_name(d) == "parametrize":
+            vals = d.args[1] if len(d.args) > 1 else next(
+                (k.value for k in d.keywords if k.arg == "argvalues"), None)
+            if not isinstance(vals, (ast.List, ast.Tuple, ast.Set)):
+                return None
+            n *= len(vals.elts)
+    return n
+
+
+def _py_ast_tests(text):
+    """[[def line, first line (decorators), end line (exclusive), name, n_assert,
+    n_cases], ...] for every test function, or None if the file doesn't parse."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+    out = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) \
+                and node.name.startswith("test_"):
+            first = min([d.lineno for d in node.decorator_list] + [node.lineno])
+            out.append([node.lineno - 1, first - 1, node.end_lineno, node.name,
+                        _ast_asserts(node), _ast_cases(node)])
+    return sorted(out)
+
+
+class _Cache:
+    """Expensive per-file results keyed by content hash, kept in a JSON sidecar
+    next to the ledger (`<ledger>.cache.json`) so a full rebuild of an unchanged
+    file costs a hash, not a reparse. One section per kind of result; a build
+    keeps only the entries for files it saw."""
+
+    def __init__(self, ledger_path):
+        self.path = Path(f"{ledger_path}.cache.json")
+        try:
+            self.data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            self.data = {}
+        self.seen = {}
+
+    def get(self, section, key):
+        self.seen.setdefault(section, set()).add(key)
+        return self.data.get(section, {}).get(key)
+
+    def put(self, section, key, value):
+        self.seen.setdefault(section, set()).add(key)
+        self.data.setdefault(section, {})[key] = value
+
+    def save(self, prune=()):
+        for section in prune:
+            keep = self.seen.get(section, set())
+            self.data[section] = {k: v for k, v in self.data.get(section, {}).items()
+                                  if k in keep}
+        self.path.write_text(json.dumps(self.data))
+
+
+# --- helper index: assertions one call away ---
+# "An assertion can hide in a helper" is the commonest false `no_assert`. So the
+# build also indexes every non-test function in the suite — in the test files and
+# in conftest / test-util / support modules — with its own assertion count and the
+# names it calls. After the walk, each helper's count is closed over its callees,
+# and a test that calls an asserting helper has that count credited as
+# `helper_asserts`: its no_assert flag is dropped and its priority follows the
+# combined count. A call resolves the way the language would: to a function
+# defined in the same file, else through the file's imports (Python `from x
+# import y` and `import x` + `x.y(...)`, JS/TS relative `import`/`require`, Go
+# packages; a name imported from outside the tree is not a helper), else in Go to
+# the same package, and only then by bare name anywhere in the suite. A name
+# that resolves to more than one definition counts as its weakest.
+HELPER_DEFS = {
+    "py":   [re.compile(r"^[ \t]*(?:async[ \t]+)?def[ \t]+(?P<name>\w+)[ \t]*\(", re.M)],
+    "js":   [re.compile(r"^[ \t]*(?:export[ \t]+)?(?:async[ \t]+)?function[ \t]*\*?[ \t]*"
+                        r"(?P<name>[\w$]+)[ \t]*\(", re.M),
+             re.compile(r"^[ \t]*(?:export[ \t]+)?(?:const|let|var)[ \t]+(?P<name>[\w$]+)[ \t]*=[ \t]*"
+                        r"(?:async[ \t]+)?(?:function\b|\([^)\n]*\)[ \t]*=>|[\w$]+[ \t]*=>)", re.M)],
+    "go":   [re.compile(r"^func[ \t]+(?:\([^)\n]*\)[ \t]*)?(?P<name>\w+)[ \t]*[\[(]", re.M)],
+    "rb":   [re.compile(r"^[ \t]*def[ \t]+(?:self\.)?(?P<name>\w+[?!]?)", re.M)],
+    "rust": [re.compile(r"^[ \t]*(?:pub(?:\([^)\n]*\))?[ \t]+)?(?:async[ \t]+)?fn[ \t]+(?P<name>\w+)", re.M)],
+}
+CALLS = {
+    # python and js: the whole `a.b.name(` chain, so a call through an imported
+    # module can be told from a method call (see _calls)
+    "py":   re.compile(r"(?<![\w.])((?:[A-Za-z_]\w*\.)*)([A-Za-z_]\w*)\s*\("),
+    "js":   re.compile(r"(?<![\w.$])((?:[A-Za-z_$][\w$]*\.)*)([A-Za-z_$][\w$]*)\s*\("),
+    "go":   re.compile(r"(?<![\w.])(?:(?P<q>\w+)\.)?(?P<name>[A-Za-z_]\w*)\s*\("),
+    # ruby calls with or without parens: `check(x)` / `check x`
+    "rb":   re.compile(r"(?<![\w.])(?:self\.)?(?P<name>[a-z_]\w*[?!]?)"
+                       r"(?:\s*\(|[ \t]+(?=[\w:'\"\[{@]))"),
+    "rust": re.compile(r"(?<![\w.:])(?:self\.)?(?P<name>[a-z_]\w*)\s*\("),
+}
+SELF_CALLS = {"", "self.", "cls.", "this."}   # prefixes of a call to a bare name
+PY_FROM = re.compile(r"^[ \t]*from[ \t]+(?P<mod>\.+[\w.]*|[\w.]+)[ \t]+import[ \t]+"
+                     r"(?P<names>\([^)]*\)|[^\n#;]*)", re.M)
+PY_IMPORT = re.compile(r"^[ \t]*import[ \t]+(?P<names>[^\n#;]*)", re.M)
+JS_IMPORT = re.compile(r"""^[ \t]*import[ \t]+(?:type[ \t]+)?(?P<what>[^'";]+?)[ \t]*from[ \t]*"""
+                       r"""['"](?P<mod>[^'"\n]+)['"]""", re.M)
+JS_IMPORT_WHAT = re.compile(r"\s*(?:(?P<default>[\w$]+)\s*,?\s*)?"
+                            r"(?:\*\s*as\s+(?P<star>[\w$]+)|\{(?P<names>[^}]*)\})?\s*")
+JS_REQUIRE = re.compile(r"""^[ \t]*(?:const|let|var)[ \t]+(?P<what>\{[^}]*\}|[\w$]+)\s*=\s*"""
+                        r"""require\(\s*['"](?P<mod>[^'"\n]+)['"]\s*\)""", re.M)
+JS_EXTS = (".js", ".ts", ".jsx", ".tsx", ".mjs", ".cjs")
+GO_IMPORT = re.compile(r'^[ \t]*(?:import[ \t]+)?(?:(?P<alias>[\w.]+)[ \t]+)?"(?P<path>[^"\n]+)"[ \t]*$',
+                       re.M)
+HELPER_DIRS = {"test", "tests", "__tests__", "spec", "specs", "support", "testutil",
+               "testutils", "testing", "helpers", "fixtures", "testhelpers"}
+HELPER_LANGS = {".js": "js", ".ts": "js", ".jsx": "js", ".tsx": "js", ".mjs": "js",
+                ".cjs": "js", ".go": "go", ".rb": "rb"}
+HELPER_CAP = 999                  # transitive counts only need to tell 0 from "some"
+INDEX_FORMAT = 2                  # bump when the shape of _index_file's result changes
+
+
+def _iter_helper_files(root: Path, seen: set):
+    """Non-test source files that likely hold test helpers: anything under a
+    test/spec/support-style directory, or named like a helper. (Python and Rust
+    files are all enumerated already.)"""
+    for p in sorted(root.rglob("*")):
+        lang = HELPER_LANGS.get(p.suffix)
+        if not lang or p in seen or not p.is_file():
+            continue
+        s = str(p)
+        if "/node_modules/" in s or "/vendor/" in s:
+            continue
+        rel = p.relative_to(root)
+        if HELPER_DIRS & set(rel.parts[:-1]) or "helper" in p.name or "testutil" in p.name:
+            yield p, lang
+
+
+def _helper_defs(text, offs, lang, test_lines):
+    """[(line, name), ...] of every function defined in the file that isn't a test."""
+    found = {}
+    for rx in HELPER_DEFS[lang]:
+        for m in rx.finditer(text):
+            j = bisect.bisect_right(offs, m.start()) - 1
+            if j not in test_lines:
+                found.setdefault(j, m.group("name"))
+    return sorted(found.items())
+
+
+def _py_names(names):
+    """(name, local name) for each entry of an import list: `a as b, c`."""
+    for part in names.strip("()\\ \t\n").replace("\n", " ").split(","):
+        bits = part.split()
+        if len(bits) == 3 and bits[1] == "as":
+            yield bits[0], bits[2]
+        elif len(bits) == 1 and bits[0] != "*":
+            yield bits[0], bits[0]
+
+
+def _imports(text, lang):
+    """({local name: [module, name in module]}, {local module alias: module}) —
+    what the file's import statements bind."""
+    names, modules = {}, {}
+    if lang == "py":
+        for m in PY_FROM.finditer(text):
+            mod = m.group("mod")
+            for name, local in _py_names(m.group("names")):
+                names[local] = [mod, name]
+                modules[local] = mod + name if mod.endswith(".") else f"{mod}.{name}"
+        for m in PY_IMPORT.finditer(text):
+            for name, local in _py_names(m.group("names")):
+                modules[local] = name
+    elif lang == "js":
+        for m in JS_IMPORT.finditer(text):
+            mod, what = m.group("mod"), JS_IMPORT_WHAT.fullmatch(m.group("what"))
+            if not what:
+                continue
+            if what.group("default"):
+                names[what.group("default")] = [mod, what.group("default")]
+            if what.group("star"):
+                modules[what.group("star")] = mod
+            for part in (what.group("names") or "").split(","):
+                bits = part.replace("type ", "").split()
+                if bits:
+                    names[bits[-1]] = [mod, bits[0]]
+        for m in JS_REQUIRE.finditer(text):
+            mod, what = m.group("mod"), m.group("what")
+            if what.startswith("{"):
+                for part in what.strip("{} \n").split(","):
+                    bits = [b.strip() for b in part.split(":")]
+                    if bits[0]:
+                        names[bits[-1]] = [mod, bits[0]]
+            else:
+                names[what], modules[what] = [mod, what], mod
+    elif lang == "go":
+        for m in GO_IMPORT.finditer(text):
+            alias, path = m.group("alias"), m.group("path")
+            if alias not in (".", "_"):
+                modules[alias or path.rsplit("/", 1)[-1]] = path
+    return names, modules
+
+
+def _calls(text, a, b, lang, modules):
+    """Names called in text[a:b]; a call through an imported module is `module.name`."""
+    if lang in ("py", "js"):
+        out = set()
+        for prefix, name in CALLS[lang].findall(text, a, b):
+            if prefix in SELF_CALLS:
+                out.add(name)
+            elif prefix[:-1] in modules:
+                out.add(prefix + name)
+        return out
+    if lang == "go":
+        return {f"{q}.{name}" if q in modules else name
+                for q, name in CALLS[lang].findall(text, a, b)}
+    return set(CALLS[lang].findall(text, a, b))
+
+
+def _index_file(text, offs, lines, lang, tests, helpers=None, ends=None):
+    """This file's helpers, imports, and the names each test calls:
+    {"lang": lang, "defs": {name: [own assertions, [names it calls]]},
+     "calls": {"<def line>": [names the test calls]},
+     "imports": {local name: [module, name]}, "modules": {alias: module}}.
+    `helpers` and `ends` may come from the caller's own block sweep."""
+    if helpers is None:
+        helpers = _helper_defs(text, offs, lang, {i for i, _, _ in tests})
+    missing = [j for j, _ in helpers if ends is None or j not in ends]
+    if missing:
+        ends = {**(ends or {}), **(_indent_ends(lines, missing) if lang in INDENT_LANGS
+                                   else _brace_ends(text, offs, missing, lang))}
+    imports, modules = _imports(text, lang)
+    asserts = ASSERTS[lang].findall    # helpers need only the count, not the flags
+    defs = {}
+    for j, name in helpers:
+        a, b = offs[j], offs[ends[j]]
+        own = len(asserts(text, a, b))
+        callees = sorted(_calls(text, a, b, lang, modules) - {name})
+        if name not in defs or own < defs[name][0]:
+            defs[name] = [own, callees]
+    calls = {str(i): sorted(_calls(text, offs[a], offs[b], lang, modules))
+             for i, a, b in tests}
+    return {"lang": lang, "defs": defs, "calls": calls, "imports": imports, "modules": modules}
+
+
+def _resolve_helpers(indexes, rows):
+    """Close helper assertion counts over the call graph, then credit each row
+    with the assertions its helpers make (see HELPER_DEFS above)."""
+    anywhere, py_modules, go_dirs = {}, {}, {}
+    for rel, idx in indexes.items():
+        for name in idx["defs"]:
+            anywhere.setdefault((idx["lang"], name), []).append(rel)
+        if idx["lang"] == "py":
+            parts = rel[:-len(".py")].split("/")
+            if parts[-1] == "__init__":
+                parts.pop()
+            for k in range(len(parts)):          # the tree root needn't be on sys.path
+                py_modules.setdefault(".".join(parts[k:]), []).append(rel)
+        elif idx["lang"] == "go":
+            go_dirs.setdefault(posixpath.dirname(rel), []).append(rel)
+
+    def module_files(rel, lang, mod):
+        if lang == "py" and mod.startswith("."):
+            dots = len(mod) - len(mod.lstrip("."))
+            base = rel.split("/")[:-1]
+            if dots - 1 > len(base):
+                return []
+            target = "/".join(base[:len(base) - dots + 1] + [p for p in mod[dots:].split(".") if p])
+            return [p for p in (f"{target}.py", f"{target}/__init__.py") if p in indexes]
+        if lang == "py":
+            return py_modules.get(mod, [])
+        if lang == "js" and mod.startswith("."):
+            target = posixpath.normpath(posixpath.join(posixpath.dirname(rel), mod))
+            return [p for p in (target, *(target + e for e in JS_EXTS),
+                                *(f"{target}/index{e}" for e in JS_EXTS)) if p in indexes]
+        if lang == "go":
+            parts = mod.split("/")
+            return next((go_dirs[d] for d in ("/".join(parts[k:]) for k in range(len(parts)))
+                         if d in go_dirs), [])
+        return []                                 # a package from outside the tree
+
+    resolved = {}
+
+    def targets(rel, call, seen=()):
+        """The (file, name) definitions a call made from `rel` can reach."""
+        if (rel, call) in resolved:
+            return resolved[(rel, call)]
+        idx, out = indexes[rel], []
+        lang = idx["lang"]
+        if call in idx["defs"]:
+            out = [(rel, call)]
+        elif "." in call:
+            q, name = call.rsplit(".", 1)
+            out = [(f, name) for f in module_files(rel, lang, idx["modules"].get(q, ""))
+                   if name in indexes[f]["defs"]]
+        elif call in idx.get("imports", {}):
+            mod, name = idx["imports"][call]
+            for f in module_files(rel, lang, mod):
+                if (f, name) not in seen:             # re-exported: follow its import
+                    out += targets(f, name, seen + ((rel, call),))
+        else:
+            out = anywhere.get((lang, call), [])
+            if lang == "go":
+                here = posixpath.dirname(rel)
+                out = [f for f in out if posixpath.dirname(f) == here] or out
+            out = [(f, call) for f in out]
+        resolved[(rel, call)] = out
+        return out
+
+    memo = {}
+
+    def total(key, stack=()):
+        if key in memo:
+            return memo[key]
+        if key in stack:
+            return 0                  # a recursion back into a helper
+        own, callees = indexes[key[0]]["defs"][key[1]]
+        n = min(own + sum(reach(key[0], c, stack + (key,)) for c in callees), HELPER_CAP)
+        memo[key] = n
+        return n
+
+    def reach(rel, call, stack=()):
+        return min((total(t, stack) for t in targets(rel, call)), default=0)
+
+    for r in rows:
+        idx = indexes.get(r["file"])
+        calls = idx.get("calls", {}).get(str(r["line"] - 1), ()) if idx else ()
+        helpers = [c for c in calls if c != r["name"] and reach(r["file"], c)]
+        r["helpers"] = helpers
+        r["helper_asserts"] = min(sum(reach(r["file"], c) for c in helpers), HELPER_CAP)
+        flags = set(r["flags"])
+        if r["helper_asserts"]:
+            flags.discard("no_assert")
+        elif r["n_assert"] == 0:
+            flags.add("no_assert")
+        r["flags"] = sorted(flags)
+        r["priority"] = _priority(r["flags"], r["n_assert"] + r["helper_asserts"])
+
+
+# --- copy-paste clusters ---
+# Suites are full of pasted tests that differ only in names and values — and are
+# equally meaningless. Each row gets a fingerprint of its body (header line
+# excluded) with every identifier renamed by first appearance (v0, v1, …) and every
+# literal collapsed, keeping keywords and attribute names (`.assertEqual`,
+# `.toBe`) so the shape of what is checked survives. Rows sharing a fingerprint
+# form a cluster; `set --cluster` offers one verdict to all its pending members.
+FP_TOKEN = re.compile(r"""(?P<s>"(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|`[^`]*`)"""
+                      r"|(?P<n>\b\d[\w.]*)|(?P<i>[A-Za-z_$][\w$]*[?!]?)|(?P<p>\S)")
+FP_COMMENT = {"py": re.compile(r"#[^\n]*"), "rb": re.compile(r"#[^\n]*"),
+              "js": re.compile(r"//[^\n]*"), "go": re.compile(r"//[^\n]*"),
+              "rust": re.compile(r"//[^\n]*")}
+FP_KEEP = frozenset("""
+    and as assert async await break case catch class const continue def defer do elif
+    else elsif end ensure except false finally fn for func function go if impl in is
+    lambda let loop match mut new nil none None not null or pass raise range rescue
+    return self Self this throw true True False try undefined unless var while with
+    yield
+""".split())
+FP_MIN_TOKENS = 8                 # shorter bodies (`pass`, one call) don't cluster
+
+
+def _fingerprint(text, pos, endpos, lang):
+    """Normalized-body hash, or None for a body too short to say anything."""
+    body = FP_COMMENT[lang].sub("", text[pos:endpos])
+    names, out = {}, []
+    for m in FP_TOKEN.finditer(body):
+        kind, tok = m.lastgroup, m.group()
+        if kind == "s":
+            tok = "S"
+        elif kind == "n":
+            tok = "N"
+        elif kind == "i" and tok not in FP_KEEP and not (out and out[-1] == "."):
+            tok = names.setdefault(tok, f"v{len(names)}")
+        out.append(tok)
+    return _hash(" ".join(out)) if len(out) >= FP_MIN_TOKENS else None
+
+
+def _cluster(rows):
+    """Group rows by fingerprint: members of a group of two or more get its
+    fingerprint as `cluster` and the group size as `cluster_size`."""
+    size = {}
+    for r in rows:
+        if r.get("fingerprint"):
+            size[r["fingerprint"]] = size.get(r["fingerprint"], 0) + 1
+    for r in rows:
+        n = size.get(r.get("fingerprint"), 0)
+        r["cluster"] = r["fingerprint"] if n > 1 else None
+        r["cluster_size"] = n if n > 1 else None
+
+
+def _scan_file(path: Path, root: Path, lang: str, data: bytes,
+               parser: str = "regex", cache: _Cache = None, helpers_only=False):
+    """Every test in one file as a fresh (pending) ledger row, plus the file's
+    helper index (see `_index_file`) → (rows, index)."""
+    text = data.decode("utf-8", errors="replace")
+    offs = [0]                    # offs[i] = where line i starts; offs[-1] = len(text)
+    for l in text.splitlines(keepends=True):
+        offs.append(offs[-1] + len(l))
+    lines = text.splitlines()
+    rel = str(path.relative_to(root))
+    file_hash = _hash(data)
+    parsed = None
+    if helpers_only:
+        tests = []
+    elif lang == "py" and parser == "ast":
+        parsed = cache.get("ast", file_hash) if cache else None
+        if parsed is None:
+            parsed = _py_ast_tests(text)
+            if cache and parsed is not None:
+                cache.put("ast", file_hash, parsed)
+    if parsed is not None:
+        # (def line, name, extra, first line, end, n_assert, n_cases)
+        tests = [(i, name, [], first, end, n, cases)
+                 for i, first, end, name, n, cases in parsed]
+    helpers = ends = None
+    if parsed is None and not helpers_only:
+        found = list(_find_tests(lines, lang))
+        starts = [i for i, _, _ in found]
+        # One sweep ends tests and helpers alike — except in JS, where an arrow
+        # test that never opens a brace runs to the next *test*, not helper
+        if lang in INDENT_LANGS:
+            helpers = _helper_defs(text, offs, lang, set(starts))
+            ends = _indent_ends(lines, starts + [j for j, _ in helpers])
+        elif lang != "js":
+            helpers = _helper_defs(text, offs, lang, set(starts))
+            ends = _brace_ends(text, offs, starts + [j for j, _ in helpers], lang)
+        else:
+            ends = _brace_ends(text, offs, starts, lang)
+        tests = [(i, name, extra, i, ends[i], None, None) for i, name, extra in found]
+    index = _index_file(text, offs, lines, lang, [(t[0], t[3], t[4]) for t in tests],
+                        helpers, ends)
+    rows = []
+    for i, name, extra, first, end, n_ast, cases in tests:
+        # decorators count toward assertions and flags; the header is the def line
+        n_assert, flags = _flags(text, lang, extra, offs[first], offs[end], n_ast, offs[i])
+        body_end = _body_end(lines, i, end, lang)
+        row = {
+            "id": f"{rel}:{i + 1}",
+            "file": rel,
+            "line": i + 1,
+            "name": name,
+            "lang": lang,
+            "n_assert": n_assert,
+            "loc": end - i,
+            "flags": flags,
+            "priority": _priority(flags, n_assert),
+            "status": "pending",      # pending | green | yellow | red | skip
+            "pattern": None,
+            "severity": None,
+            "evidence": None,         # file:line the verdict rests on
+            "story": None,            # the failure story (required for red/yellow)
+            "verified": None,         # read | confirmed
+            "file_hash": file_hash,   # whole-file content hash, for build --update
+            # this test's body (from its def line), for carrying verdicts
+            "body_hash": _hash(text[offs[i]:offs[body_end]]),
+            # this test's body with names and literals normalized, for clusters
+            "fingerprint": _fingerprint(text, offs[min(i + 1, body_end)], offs[body_end], lang),
+        }
+        if parsed is not None:
+            row["parser"] = "ast"
+            row["n_cases"] = cases    # parametrize expansion; None = not a literal
+        rows.append(row)
+    return rows, index
+
+
+def _carry_verdicts(old: list, new: list) -> int:
+    """Copy verdicts from `old` onto the rows of `new` whose test is unchanged —
+    same name, same body hash. Line numbers (and so ids) may have moved; the
+    verdict rides with the body, not the position. Returns how many adjudicated
+    verdicts were carried."""
+    by_body = {}
+    for r in old:
+        if r.get("body_hash"):
+            by_body.setdefault((r["name"], r["body_hash"]), []).append(r)
+    carried = 0
+    for r in new:
+        prev = by_body.get((r["name"], r["body_hash"]))
+        if prev:
+            src = prev.pop(0)
+            for k in VERDICT_FIELDS:
+                r[k] = src.get(k)
+            carried += r["status"] != "pending"
+    return carried
+
+
+def _parser_for(lang, parser):
+    return "ast" if lang == "py" and parser == "ast" else "regex"
+
+
 def build(args):
     root = Path(args.testdir).resolve()
     if not root.exists():
         sys.exit(f"no such directory: {root}")
-    rows = []
+    out = Path(args.out)
+    prev = {}
+    if args.update:
+        if out.exists():
+            for r in _open(out).rows():
+                prev.setdefault(r["file"], []).append(r)
+        else:
+            print(f"no ledger at {out} yet — doing a full build")
+    cache = _Cache(out)
+    rows, indexes, seen = [], {}, set()
+    kept = changed = carried = reset = 0
     for path, lang in _iter_test_files(root):
+        seen.add(path)
         try:
-            lines = path.read_text(errors="replace").splitlines()
+            data = path.read_bytes()
         except Exception:
             continue
-        arx = ASSERTS[lang]
-        for i, name, extra in _find_tests(lines, lang):
-            body, loc = _body(lines, i, lang)
-            n_assert = len(arx.findall(body))
-            flags = _flags(body, n_assert, extra)
-            rows.append({
-                "id": f"{path.relative_to(root)}:{i + 1}",
-                "file": str(path.relative_to(root)),
-                "line": i + 1,
-                "name": name,
-                "lang": lang,
-                "n_assert": n_assert,
-                "loc": loc,
-                "flags": flags,
-                "priority": _priority(flags, n_assert),
-                "status": "pending",      # pending | green | yellow | red | skip
-                "pattern": None,
-                "severity": None,
-                "evidence": None,         # file:line the verdict rests on
-                "story": None,            # the failure story (required for red/yellow)
-                "verified": None,         # read | confirmed
-            })
-    out = Path(args.out)
-    out.write_text("\n".join(json.dumps(r) for r in rows) + "\n")
-    _print_build_summary(rows, root, out)
+        rel = str(path.relative_to(root))
+        file_hash, parser = _hash(data), _parser_for(lang, args.parser)
+        key = f"{parser}:{file_hash}:{INDEX_FORMAT}"
+        old = prev.pop(rel, None)
+        if old and old[0].get("file_hash") == file_hash \
+                and old[0].get("parser", "regex") == parser:
+            rows.extend(old)          # untouched file: rows and verdicts as they were
+            kept += len(old)
+            indexes[rel] = cache.get("index", key) \
+                or _scan_file(path, root, lang, data, args.parser, cache)[1]
+            cache.put("index", key, indexes[rel])
+            continue
+        new, indexes[rel] = _scan_file(path, root, lang, data, args.parser, cache)
+        cache.put("index", key, indexes[rel])
+        if old:
+            changed += 1
+            n = _carry_verdicts(old, new)
+            carried += n
+            reset += sum(1 for r in old if r["status"] != "pending") - n
+        rows.extend(new)
+    for path, lang in _iter_helper_files(root, seen):
+        try:
+            data = path.read_bytes()
+        except Exception:
+            continue
+        rel, key = str(path.relative_to(root)), f"helpers:{_hash(data)}:{INDEX_FORMAT}"
+        indexes[rel] = cache.get("index", key) \
+            or _scan_file(path, root, lang, data, helpers_only=True)[1]
+        cache.put("index", key, indexes[rel])
+    _resolve_helpers(indexes, rows)
+    _cluster(rows)
+    led = _open(out, create=True)
+    led.replace(rows)
+    led.close()
+    cache.save(prune=("ast", "index"))
+    note = None
+    if args.update and (kept or changed or prev):
+        gone = sum(len(v) for v in prev.values())
+        note = (f"update:    {kept} rows kept from unchanged files; {changed} files "
+                f"changed ({carried} verdicts carried, {reset} reset to pending); "
+                f"{gone} rows dropped from {len(prev)} deleted files")
+    _print_build_summary(rows, root, out, note)
 
 
-def _print_build_summary(rows, root, out):
+def _print_build_summary(rows, root, out, note=None):
     from collections import Counter
     pr = Counter(r["priority"] for r in rows)
     fl = Counter(f for r in rows for f in r["flags"])
@@ -329,6 +1065,18 @@ def _print_build_summary(rows, root, out):
           f"low={pr.get('low',0)} (likely green, sample)")
     if fl:
         print("flags:     " + "  ".join(f"{k}={v}" for k, v in fl.most_common()))
+    via = [r for r in rows if r.get("helper_asserts")]
+    if via:
+        rescued = sum(1 for r in via if not r["n_assert"])
+        print(f"helpers:   {len(via)} tests assert through helpers "
+              f"({rescued} of them only there — not flagged no_assert)")
+    clusters = {r["cluster"] for r in rows if r.get("cluster")}
+    if clusters:
+        members = sum(1 for r in rows if r.get("cluster"))
+        print(f"clusters:  {members} tests in {len(clusters)} copy-paste clusters "
+              f"(`set --cluster` adjudicates one for all)")
+    if note:
+        print(note)
     print("\nnext: review high+med, sample low. `ledger.py next <ledger> "
           "--priority high` to pull a batch.")
 
@@ -336,97 +1084,1038 @@ def _print_build_summary(rows, root, out):
 # --------------------------------------------------------------------------- #
 # Ledger I/O
 # --------------------------------------------------------------------------- #
+# Two storage formats behind one interface, picked by the ledger's extension:
+#
+#   *.jsonl          one row per line. Every write rewrites the whole file — simple,
+#                    greppable, and fine up to a few thousand tests.
+#   *.db / *.sqlite  SQLite (stdlib). Rows are keyed by id and indexed by
+#                    status/priority/flag, so a `set` is a point update and `next`
+#                    an index range scan, whatever the size of the suite. Status
+#                    counts are kept by triggers, so `stats` doesn't scan either.
+#
+# `convert` moves a ledger between the two (import a .jsonl, export a .db).
+#
+# Both are safe with several writers — the fan-out runs subagents in parallel.
+# Every read-modify-write holds the ledger's write lock for its whole duration (an
+# flock on `<ledger>.lock` for .jsonl, a BEGIN IMMEDIATE transaction for SQLite),
+# and .jsonl is replaced atomically, so a concurrent reader never sees half a file.
+# On top of that, `next --claim` leases rows to one worker (status in_progress)
+# until the lease expires, so parallel workers draw disjoint batches.
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+LEASE_SECONDS = 15 * 60
+
 
 def _load(path):
     return [json.loads(l) for l in Path(path).read_text().splitlines() if l.strip()]
 
 
 def _save(path, rows):
-    Path(path).write_text("\n".join(json.dumps(r) for r in rows) + "\n")
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text("\n".join(json.dumps(r) for r in rows) + "\n")
+    os.replace(tmp, path)
+
+
+def _cov_order(r):
+    rank = r.get("cov_rank")
+    return COV_UNRANKED if rank is None else rank
+
+
+def _available(r, now):
+    """Pending, or claimed by a worker whose lease has run out."""
+    return r["status"] == "pending" or (r["status"] == "in_progress"
+                                        and (r.get("lease") or 0) < now)
+
+
+def _refusal(r, worker, now, fields=None):
+    """Why `worker` may not write `fields` on row `r` — or None if it may. Only a
+    worker that identifies itself is checked; the primary can always overwrite —
+    except with a verdict propagated from a cluster sibling, which only ever lands
+    on a row still available (checked here, under the ledger lock, so a member
+    claimed or judged since the caller looked is never clobbered)."""
+    if fields and fields.get("propagated_from") and not _available(r, now):
+        return (f"claimed by {r.get('worker')}" if r["status"] == "in_progress"
+                else f"already {r['status']}")
+    if (worker and r["status"] == "in_progress" and r.get("worker") != worker
+            and (r.get("lease") or 0) >= now):
+        return f"claimed by {r['worker']} for another {int(r['lease'] - now)}s"
+    return None
+
+
+class JsonlLedger:
+    """The whole ledger in memory; written back in one go on `update`."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    @contextmanager
+    def _locked(self):
+        with open(f"{self.path}.lock", "a") as fh:
+            if fcntl:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            yield                     # released when fh closes
+
+    def rows(self):
+        return _load(self.path)
+
+    def stream(self, status=None, since=None, cluster=None):
+        """Rows one at a time, in ledger order, optionally only those with `status`,
+        a verdict written after revision `since`, and/or in `cluster`."""
+        with open(self.path) as fh:
+            for l in fh:
+                if not l.strip():
+                    continue
+                r = json.loads(l)
+                if ((status is None or r["status"] == status)
+                        and (since is None or (r.get("rev") or 0) > since)
+                        and (cluster is None or r.get("cluster") == cluster)):
+                    yield r
+
+    def revision(self):
+        return max(((r.get("rev") or 0) for r in self.stream()), default=0)
+
+    def get(self, rid):
+        return next((r for r in self.rows() if r["id"] == rid), None)
+
+    def select(self, priority=None, flag=None, limit=None, rows=None):
+        """Rows available to review (see `_available`), coverage rank first (see
+        `coverage`), then ledger order."""
+        now = time.time()
+        sel = [r for r in (self.rows() if rows is None else rows) if _available(r, now)
+               and (not priority or r["priority"] == priority)
+               and (not flag or flag in r["flags"])]
+        sel.sort(key=_cov_order)
+        return sel[:limit] if limit else sel
+
+    def claim(self, worker, lease, priority=None, flag=None, limit=None):
+        with self._locked():
+            rows = self.rows()
+            sel = self.select(priority, flag, limit, rows)
+            until = time.time() + lease
+            for r in sel:
+                r.update(status="in_progress", worker=worker, lease=until)
+            if sel:
+                _save(self.path, rows)
+        return sel
+
+    def counts(self):
+        """(Counter by status, Counter by priority of the pending rows, total)."""
+        from collections import Counter
+        st, pend, total = Counter(), Counter(), 0
+        for r in self.stream():         # one row in memory at a time, like GROUP BY
+            st[r["status"]] += 1
+            if r["status"] == "pending":
+                pend[r["priority"]] += 1
+            total += 1
+        return st, pend, total
+
+    def update(self, changes, worker=None, stamp=True):
+        """Apply {id: {field: value}}; returns {id: why} for the rows it refused.
+        Each call is one ledger revision: unless `stamp` is off (for non-verdict
+        data), every row it writes gets the new revision number as `rev`."""
+        refused = {}
+        with self._locked():
+            rows = self.rows()
+            idx = {r["id"]: r for r in rows}
+            now = time.time()
+            rev = max(((r.get("rev") or 0) for r in rows), default=0) + 1
+            for rid, fields in changes.items():
+                r = idx.get(rid)
+                why = ("no such id in ledger" if r is None
+                       else _refusal(r, worker, now, fields))
+                if why:
+                    refused[rid] = why
+                else:
+                    r.update(fields)
+                    if stamp:
+                        r["rev"] = rev
+            if len(refused) < len(changes):
+                _save(self.path, rows)
+        return refused
+
+    def replace(self, rows):
+        with self._locked():
+            _save(self.path, rows)
+
+    def close(self):
+        pass
+
+
+class SqliteLedger:
+    """Rows stored whole as JSON, with the fields queries filter on mirrored into
+    indexed columns (and flags into their own table)."""
+
+    # row fields copied into columns of the same name, for WHERE / ORDER BY
+    MIRRORED = ("id", "file", "status", "priority", "lease", "cov_rank", "rev", "cluster")
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rows (
+        seq      INTEGER PRIMARY KEY,       -- ledger order (file, line)
+        id       TEXT NOT NULL UNIQUE,
+        file     TEXT NOT NULL,
+        status   TEXT NOT NULL,
+        priority TEXT NOT NULL,
+        lease    REAL,                      -- claim expiry (epoch s) while in_progress
+        cov_rank INTEGER,                   -- 0 covers nothing .. 2 covers unique lines
+        rev      INTEGER,                   -- ledger revision of the last verdict write
+        cluster  TEXT,                      -- copy-paste cluster (body fingerprint)
+        data     TEXT NOT NULL              -- the full row, as JSON
+    );
+    CREATE INDEX IF NOT EXISTS rows_queue ON rows (status, priority, seq);
+    CREATE TABLE IF NOT EXISTS flags (
+        flag TEXT NOT NULL,
+        seq  INTEGER NOT NULL,
+        PRIMARY KEY (flag, seq)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS flags_seq ON flags (seq);
+    CREATE TABLE IF NOT EXISTS counts (
+        status TEXT NOT NULL, priority TEXT NOT NULL, n INTEGER NOT NULL,
+        PRIMARY KEY (status, priority)
+    ) WITHOUT ROWID;
+    CREATE TRIGGER IF NOT EXISTS rows_ins AFTER INSERT ON rows BEGIN
+        INSERT OR IGNORE INTO counts VALUES (new.status, new.priority, 0);
+        UPDATE counts SET n = n + 1 WHERE status = new.status AND priority = new.priority;
+    END;
+    CREATE TRIGGER IF NOT EXISTS rows_del AFTER DELETE ON rows BEGIN
+        UPDATE counts SET n = n - 1 WHERE status = old.status AND priority = old.priority;
+    END;
+    CREATE TRIGGER IF NOT EXISTS rows_upd AFTER UPDATE OF status, priority ON rows BEGIN
+        UPDATE counts SET n = n - 1 WHERE status = old.status AND priority = old.priority;
+        INSERT OR IGNORE INTO counts VALUES (new.status, new.priority, 0);
+        UPDATE counts SET n = n + 1 WHERE status = new.status AND priority = new.priority;
+    END;
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        # autocommit mode: every write below opens its own BEGIN IMMEDIATE, so the
+        # read half of a read-modify-write already holds the write lock
+        self.db = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode = WAL")   # readers don't block the writer
+        self.db.executescript(self.SCHEMA)
+        have = {c[1] for c in self.db.execute("PRAGMA table_info(rows)")}
+        for col in self.MIRRORED:
+            if col not in have:       # ledger written by an older ledger.py
+                with self._write():
+                    self.db.execute(f"ALTER TABLE rows ADD COLUMN {col}")
+                    self.db.execute(f"UPDATE rows SET {col} = json_extract(data, '$.{col}')")
+        self.db.execute("CREATE INDEX IF NOT EXISTS rows_rev ON rows (rev)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS rows_cluster ON rows (cluster)")
+
+    @contextmanager
+    def _write(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def _put(self, seq, r):
+        cols = ", ".join(f"{c} = ?" for c in self.MIRRORED)
+        self.db.execute(f"UPDATE rows SET {cols}, data = ? WHERE seq = ?",
+                        [r.get(c) for c in self.MIRRORED] + [json.dumps(r), seq])
+
+    def _rows(self, sql, params=()):
+        return [json.loads(d) for (d,) in self.db.execute(sql, params)]
+
+    def rows(self):
+        return self._rows("SELECT data FROM rows ORDER BY seq")
+
+    def stream(self, status=None, since=None, cluster=None):
+        sql, params = "SELECT data FROM rows WHERE 1", []
+        if cluster is not None:
+            sql += " AND cluster = ?"
+            params.append(cluster)
+        if status is not None:
+            sql += " AND status = ?"
+            params.append(status)
+        if since is not None:
+            sql += " AND rev > ?"
+            params.append(since)
+        for (d,) in self.db.execute(sql + " ORDER BY seq", params):
+            yield json.loads(d)
+
+    def revision(self):
+        return self.db.execute("SELECT COALESCE(MAX(rev), 0) FROM rows").fetchone()[0]
+
+    def get(self, rid):
+        got = self._rows("SELECT data FROM rows WHERE id = ?", (rid,))
+        return got[0] if got else None
+
+    def _select(self, priority, flag, limit):
+        sql = ("SELECT seq, data FROM rows WHERE (status = 'pending' "
+               "OR (status = 'in_progress' AND COALESCE(lease, 0) < ?))")
+        params = [time.time()]
+        if priority:
+            sql += " AND priority = ?"
+            params.append(priority)
+        if flag:
+            sql += " AND seq IN (SELECT seq FROM flags WHERE flag = ?)"
+            params.append(flag)
+        sql += f" ORDER BY COALESCE(cov_rank, {COV_UNRANKED}), seq"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [(seq, json.loads(d)) for seq, d in self.db.execute(sql, params)]
+
+    def select(self, priority=None, flag=None, limit=None):
+        return [r for _, r in self._select(priority, flag, limit)]
+
+    def claim(self, worker, lease, priority=None, flag=None, limit=None):
+        with self._write():
+            sel = self._select(priority, flag, limit)
+            until = time.time() + lease
+            for seq, r in sel:
+                r.update(status="in_progress", worker=worker, lease=until)
+                self._put(seq, r)
+        return [r for _, r in sel]
+
+    def counts(self):
+        from collections import Counter
+        st, pend = Counter(), Counter()
+        for status, priority, n in self.db.execute("SELECT status, priority, n FROM counts"):
+            st[status] += n
+            if status == "pending":
+                pend[priority] += n
+        return st, pend, sum(st.values())
+
+    def update(self, changes, worker=None, stamp=True):
+        refused = {}
+        with self._write():
+            now = time.time()
+            rev = self.revision() + 1
+            for rid, fields in changes.items():
+                got = self.db.execute("SELECT seq, data FROM rows WHERE id = ?",
+                                      (rid,)).fetchone()
+                r = json.loads(got[1]) if got else None
+                why = ("no such id in ledger" if r is None
+                       else _refusal(r, worker, now, fields))
+                if why:
+                    refused[rid] = why
+                    continue
+                r.update(fields)
+                if stamp:
+                    r["rev"] = rev
+                self._put(got[0], r)
+                if "flags" in fields:
+                    self.db.execute("DELETE FROM flags WHERE seq = ?", (got[0],))
+                    self.db.executemany("INSERT INTO flags VALUES (?, ?)",
+                                        [(f, got[0]) for f in r["flags"]])
+        return refused
+
+    def replace(self, rows):
+        cols = ", ".join(("seq",) + self.MIRRORED + ("data",))
+        marks = ", ".join("?" * (len(self.MIRRORED) + 2))
+        with self._write():
+            self.db.execute("DELETE FROM flags")
+            self.db.execute("DELETE FROM rows")
+            self.db.execute("DELETE FROM counts")
+            self.db.executemany(f"INSERT INTO rows ({cols}) VALUES ({marks})",
+                                ([seq] + [r.get(c) for c in self.MIRRORED] + [json.dumps(r)]
+                                 for seq, r in enumerate(rows)))
+            self.db.executemany("INSERT INTO flags VALUES (?, ?)",
+                                ((f, seq) for seq, r in enumerate(rows) for f in r["flags"]))
+
+    def close(self):
+        self.db.close()
+
+
+def _open(path, create=False):
+    if not create and not Path(path).exists():
+        sys.exit(f"no such ledger: {path}")
+    cls = SqliteLedger if Path(path).suffix in SQLITE_SUFFIXES else JsonlLedger
+    return cls(path)
 
 
 def stats(args):
-    from collections import Counter
-    rows = _load(args.ledger)
-    st = Counter(r["status"] for r in rows)
-    pend = Counter(r["priority"] for r in rows if r["status"] == "pending")
-    print(f"{len(rows)} tests | "
+    led = _open(args.ledger)
+    st, pend, total = led.counts()
+    print(f"{total} tests | "
           f"red={st.get('red',0)} yellow={st.get('yellow',0)} "
           f"green={st.get('green',0)} skip={st.get('skip',0)} "
-          f"pending={st.get('pending',0)}")
+          f"pending={st.get('pending',0)}"
+          + (f" in_progress={st['in_progress']}" if st.get("in_progress") else ""))
     if st.get("pending"):
         print(f"pending by priority: high={pend.get('high',0)} "
               f"med={pend.get('med',0)} low={pend.get('low',0)}")
-    done = len(rows) - st.get("pending", 0)
-    print(f"coverage: {done}/{len(rows)} adjudicated "
-          f"({100*done//max(len(rows),1)}%)")
+    done = total - st.get("pending", 0) - st.get("in_progress", 0)
+    print(f"coverage: {done}/{total} adjudicated "
+          f"({100*done//max(total,1)}%)  ·  revision {led.revision()}")
 
 
 def nxt(args):
-    rows = _load(args.ledger)
-    sel = [r for r in rows if r["status"] == "pending"]
-    if args.priority:
-        sel = [r for r in sel if r["priority"] == args.priority]
-    if args.flag:
-        sel = [r for r in sel if args.flag in r["flags"]]
-    sel = sel[: args.limit]
+    led = _open(args.ledger)
+    if args.claim:
+        if not args.worker:
+            sys.exit("next --claim needs --worker NAME (who holds the lease)")
+        sel = led.claim(args.worker, args.lease, priority=args.priority,
+                        flag=args.flag, limit=args.limit)
+    else:
+        sel = led.select(priority=args.priority, flag=args.flag, limit=args.limit)
     if not sel:
         print("(nothing pending for that filter)")
         return
+    if args.claim:
+        print(f"claimed {len(sel)} rows for {args.worker} "
+              f"(lease {args.lease}s — record verdicts with --worker {args.worker})")
     for r in sel:
         fl = (" [" + ",".join(r["flags"]) + "]") if r["flags"] else ""
-        print(f'{r["id"]}  a={r["n_assert"]} {r["loc"]}L  {r["name"]}{fl}')
+        cov = COV_MARK.get(r.get("cov_rank"), "")
+        if r.get("cluster"):
+            cov += f'  (cluster of {r["cluster_size"]}: {r["cluster"]})'
+        via = (f'+{r["helper_asserts"]} via {",".join(r["helpers"])}'
+               if r.get("helper_asserts") else "")
+        print(f'{r["id"]}  a={r["n_assert"]}{via} {r["loc"]}L  {r["name"]}{fl}{cov}')
+
+
+STATUSES = ("red", "yellow", "green", "skip", "pending")
+VERIFIED = ("read", "confirmed", "refuted")
+VERDICT_KEYS = ("pattern", "severity", "evidence", "story", "verified")
+
+
+def _verdict(rid, v):
+    """Validate one verdict → (fields to write, None) or (None, why it's refused).
+    Shared by `set` and `apply`, so a batch obeys exactly the rules a single
+    `set` does."""
+    status = v.get("status")
+    if status not in STATUSES:
+        return None, f"status must be one of {', '.join(STATUSES)} (got {status!r})"
+    if status in ("red", "yellow") and not (v.get("evidence") and v.get("story")):
+        return None, (f"refusing to mark {rid} {status}: red/yellow require "
+                      f"evidence file:line AND story (every accusation carries "
+                      f"its receipt)")
+    if v.get("verified") and v["verified"] not in VERIFIED:
+        return None, f"verified must be one of {', '.join(VERIFIED)}"
+    fields = {"status": status, "worker": None, "lease": None,   # releases a claim
+              "propagated_from": None}
+    fields.update((k, v[k]) for k in VERDICT_KEYS if v.get(k))
+    return fields, None
 
 
 def _set(args):
-    rows = _load(args.ledger)
-    idx = {r["id"]: r for r in rows}
-    r = idx.get(args.id)
-    if not r:
-        sys.exit(f"no such id in ledger: {args.id}")
-    if args.status in ("red", "yellow"):
-        if not (args.evidence and args.story):
-            sys.exit(f"refusing to mark {args.id} {args.status}: "
-                     f"red/yellow require --evidence file:line AND --story "
-                     f"(every accusation carries its receipt)")
-    r["status"] = args.status
-    if args.pattern:  r["pattern"] = args.pattern
-    if args.severity: r["severity"] = args.severity
-    if args.evidence: r["evidence"] = args.evidence
-    if args.story:    r["story"] = args.story
-    if args.verified: r["verified"] = args.verified
-    _save(args.ledger, rows)
+    fields, why = _verdict(args.id, vars(args))
+    if why:
+        sys.exit(why)
+    led = _open(args.ledger)
+    changes = {args.id: fields}
+    if args.cluster:
+        row = led.get(args.id)
+        if not row or not row.get("cluster"):
+            sys.exit(f"{args.id} is not in a copy-paste cluster (rebuild to fingerprint)")
+        now = time.time()
+        for r in led.stream(cluster=row["cluster"]):
+            if r["id"] != args.id and _available(r, now):
+                changes[r["id"]] = dict(fields, propagated_from=args.id)
+    refused = led.update(changes, worker=args.worker)
+    if args.id in refused:
+        sys.exit(f"{args.id}: {refused[args.id]}")
     print(f"{args.id} → {args.status}")
+    if len(changes) > 1:
+        print(f"  + {len(changes) - 1 - len(refused)} pending cluster members → "
+              f"{args.status}" + (f" ({len(refused)} refused: claimed or judged "
+                                  f"meanwhile)" if refused else ""))
 
 
-def report(args):
-    rows = _load(args.ledger)
-    from collections import Counter
-    st = Counter(r["status"] for r in rows)
-    reds = [r for r in rows if r["status"] == "red"]
-    yels = [r for r in rows if r["status"] == "yellow"]
-    pend = st.get("pending", 0)
-    print(f"## Verdict\n")
-    print(f"| | Count |\n|---|---:|")
-    print(f"| 🔴 Cannot fail | {st.get('red',0)} |")
-    print(f"| 🟡 Weak signal | {st.get('yellow',0)} |")
-    print(f"| 🟢 Real signal | {st.get('green',0)} |")
+def apply(args):
+    """Record a file of verdicts — one JSON object per line, the same fields as
+    `set` plus "id" — in a single write. Bad rows are reported and skipped; the
+    rest land together."""
+    src = sys.stdin if args.verdicts == "-" else open(args.verdicts)
+    changes, at_line, rejected = {}, {}, []
+    with src:
+        for n, line in enumerate(src, 1):
+            if not line.strip():
+                continue
+            try:
+                v = json.loads(line)
+            except ValueError as e:
+                rejected.append((n, "?", f"not JSON: {e}"))
+                continue
+            rid = v.get("id") if isinstance(v, dict) else None
+            if not rid:
+                rejected.append((n, "?", "no id"))
+                continue
+            unknown = set(v) - {"id", "status", *VERDICT_KEYS}
+            if unknown:
+                rejected.append((n, rid, f"unknown field(s): {', '.join(sorted(unknown))}"))
+                continue
+            fields, why = _verdict(rid, v)
+            if why:
+                rejected.append((n, rid, why))
+                continue
+            changes[rid] = fields
+            at_line[rid] = n
+    refused = _open(args.ledger).update(changes, worker=args.worker) if changes else {}
+    applied = len(changes) - len(refused)
+    rejected += [(at_line[rid], rid, why) for rid, why in refused.items()]
+    print(f"applied {applied} verdicts; rejected {len(rejected)}")
+    for n, rid, why in sorted(rejected):
+        print(f"  line {n}  {rid}: {why}")
+    if rejected:
+        sys.exit(1)
+
+
+REPORT_GROUPS = (("red", "🔴 Cannot fail"), ("yellow", "🟡 Weak signal"))
+
+
+def _finding(r):
+    """One red/yellow row as its markdown bullet."""
+    ev = f" · evidence `{r['evidence']}`" if r["evidence"] else ""
+    sv = f" · {r['severity']}" if r["severity"] else ""
+    vf = f" · {r['verified']}" if r["verified"] else ""
+    return (f"- **`{r['id']}`** — {r['name']} "
+            f"({r.get('pattern') or 'unclassified'}{sv}{vf}){ev}\n"
+            f"  - {r['story'] or '(no story recorded)'}")
+
+
+def _verdict_table(st, total, out=print):
+    pend = st.get("pending", 0) + st.get("in_progress", 0)
+    out(f"## Verdict\n")
+    out(f"| | Count |\n|---|---:|")
+    out(f"| 🔴 Cannot fail | {st.get('red',0)} |")
+    out(f"| 🟡 Weak signal | {st.get('yellow',0)} |")
+    out(f"| 🟢 Real signal | {st.get('green',0)} |")
     if pend:
-        print(f"| ⚪ Not yet adjudicated | {pend} |")
-    print(f"\n_{len(rows)-pend} of {len(rows)} tests adjudicated"
-          + (f"; {pend} still pending — coverage is incomplete._" if pend
-             else " — full coverage._"))
-    for label, group in (("🔴 Cannot fail", reds), ("🟡 Weak signal", yels)):
-        if not group:
+        out(f"| ⚪ Not yet adjudicated | {pend} |")
+    out(f"\n_{total-pend} of {total} tests adjudicated"
+        + (f"; {pend} still pending — coverage is incomplete._" if pend
+           else " — full coverage._"))
+
+
+def report(args):
+    """The verdict, streamed from the ledger: counts come from `counts()` and each
+    finding is written as it is read, so memory follows the number of groups (in
+    --out-dir mode: directories × pattern × severity), never the number of rows."""
+    led = _open(args.ledger)
+    st, _, total = led.counts()
+    rev = led.revision()
+    if args.out_dir:
+        return _report_shards(led, st, total, rev, args)
+    _verdict_table(st, total)
+    print(f"\n_Ledger revision {rev}"
+          + (f"; showing verdicts written after revision {args.since}._"
+             if args.since is not None else "._"))
+    for status, label in REPORT_GROUPS:
+        header = False
+        for r in led.stream(status, args.since):
+            if not header:
+                print(f"\n## {label}\n")
+                header = True
+            print(_finding(r))
+
+
+SHARD_HANDLES = 64                # open shard files at once; older ones are reopened
+
+
+def _report_shards(led, st, total, rev, args):
+    """One markdown shard per test directory (findings under a heading per file),
+    plus index.md: the verdict table and a group table linking every shard."""
+    out = Path(args.out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    handles, groups, shards = {}, {}, {}
+    last_file = {}
+
+    def shard(d):
+        fh = handles.pop(d, None)
+        if fh is None:
+            if d not in shards:
+                name = re.sub(r"[^\w.-]+", "_", d).strip("._") or "top"
+                # index.md is the summary's; casefold for case-insensitive filesystems
+                taken = {"index.md"} | {f.casefold() for f in shards.values()}
+                shards[d] = next(f for f in (f"{name}{i or ''}.md" for i in range(len(taken) + 1))
+                                 if f.casefold() not in taken)
+                fh = open(out / shards[d], "w")
+                fh.write(f"# `{d}/`\n")
+            else:
+                fh = open(out / shards[d], "a")
+            if len(handles) >= SHARD_HANDLES:
+                handles.pop(next(iter(handles))).close()
+        handles[d] = fh               # most recently used last
+        return fh
+
+    n = 0
+    for status, label in REPORT_GROUPS:
+        for r in led.stream(status, args.since):
+            d = str(Path(r["file"]).parent)
+            key = (d, status, r.get("pattern") or "unclassified", r.get("severity") or "")
+            groups[key] = groups.get(key, 0) + 1
+            fh = shard(d)
+            if last_file.get(d) != (status, r["file"]):
+                fh.write(f"\n## {label} · `{r['file']}`\n\n")
+                last_file[d] = (status, r["file"])
+            fh.write(_finding(r) + "\n")
+            n += 1
+    for fh in handles.values():
+        fh.close()
+    with open(out / "index.md", "w") as fh:
+        w = lambda line="": fh.write(line + "\n")       # noqa: E731
+        _verdict_table(st, total, w)
+        w(f"\n_Ledger revision {rev}"
+          + (f"; findings written after revision {args.since}._"
+             if args.since is not None else "._"))
+        w("\n## Findings by directory\n")
+        w("| Directory | Verdict | Pattern | Severity | Count |\n|---|---|---|---|---:|")
+        for (d, status, pattern, sev), c in sorted(groups.items()):
+            w(f"| [`{d}/`]({shards[d]}) | {status} | {pattern} | {sev} | {c} |")
+    print(f"report: {n} findings in {len(shards)} shards → {out}/index.md "
+          f"(ledger revision {rev})")
+
+
+def convert(args):
+    if Path(args.dst).resolve() == Path(args.src).resolve():
+        sys.exit("convert: source and destination are the same file")
+    rows = _open(args.src).rows()
+    dst = _open(args.dst, create=True)
+    dst.replace(rows)
+    dst.close()
+    print(f"{len(rows)} rows: {args.src} → {args.dst}")
+
+
+# --------------------------------------------------------------------------- #
+# Coverage ranking
+# --------------------------------------------------------------------------- #
+# With per-test coverage (coverage.py contexts, or lcov TN: records), the queue can
+# lead with the tests most likely to be meaningless: those that execute no source
+# line at all, then those whose every line some other test also executes. Each
+# matched row gets cov_lines (source lines it runs), cov_unique (lines only it
+# runs) and cov_rank; `next` orders by rank, then ledger order. The coverage file
+# is read twice as a stream — once to count how many tests hit each line, once to
+# score each test — so memory follows the number of covered lines, not the size of
+# the data. Lines in the test files themselves don't count: every test "uniquely
+# covers" its own body.
+COV_NOTHING, COV_SHARED, COV_UNIQUE = 0, 1, 2
+COV_UNRANKED = COV_UNIQUE         # rows without coverage data queue with the rest
+COV_MARK = {COV_NOTHING: "  (covers nothing)", COV_SHARED: "  (covers nothing unique)"}
+
+
+def _numbits(nb):
+    """coverage.py's numbits blob → the line numbers it holds."""
+    return [i * 8 + b for i, byte in enumerate(nb) if byte for b in range(8)
+            if byte & (1 << b)]
+
+
+def _cov_records(path):
+    """Stream (context, source path, line numbers) from a coverage.py data file or
+    an lcov tracefile. A coverage.py run with --branch records arcs instead of
+    lines (the `arc` table, not `line_bits`); the lines are the arcs' endpoints,
+    less the negative ones that mark entering or leaving a code object."""
+    with open(path, "rb") as fh:
+        is_sqlite = fh.read(16) == b"SQLite format 3\0"
+    if is_sqlite:
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            yield from ((ctx, f, _numbits(nb)) for ctx, f, nb in db.execute(
+                "SELECT context.context, file.path, line_bits.numbits FROM line_bits "
+                "JOIN context ON context.id = line_bits.context_id "
+                "JOIN file ON file.id = line_bits.file_id"))
+            arcs = db.execute(
+                "SELECT context.context, file.path, arc.fromno, arc.tono FROM arc "
+                "JOIN context ON context.id = arc.context_id "
+                "JOIN file ON file.id = arc.file_id "
+                "ORDER BY arc.context_id, arc.file_id")
+            for (ctx, f), grp in itertools.groupby(arcs, key=lambda a: a[:2]):
+                yield ctx, f, sorted({ln for a in grp for ln in a[2:] if ln > 0})
+        finally:
+            db.close()
+        return
+    test, src, lines = "", None, []
+    with open(path, errors="replace") as fh:
+        for l in fh:
+            tag, _, val = l.strip().partition(":")
+            if tag == "TN":
+                test = val
+            elif tag == "SF":
+                src, lines = val, []
+            elif tag == "DA":
+                ln, _, hits = val.partition(",")
+                if hits.split(",")[0].strip() not in ("0", ""):
+                    lines.append(int(ln))
+            elif tag == "end_of_record" and src:
+                yield test, src, lines
+                src = None
+
+
+def _cov_test(ctx):
+    """A coverage context → (dotted module hint, test name), or None for contexts
+    that aren't a test's own run (the global context, pytest-cov setup/teardown).
+    Handles pytest-cov's `path::Class::test[param]|run` and coverage.py's
+    `dynamic_context = test_function` form, `package.module.Class.test`."""
+    if not ctx or ctx.endswith(("|setup", "|teardown")):
+        return None
+    ctx = ctx.rsplit("|", 1)[0]
+    if "::" in ctx:
+        parts = ctx.split("::")
+        mod = re.sub(r"\.\w+$", "", parts[0]).replace("/", ".").replace("\\", ".")
+    else:
+        parts = ctx.rsplit(".", 1)
+        mod = parts[0] if len(parts) > 1 else ""
+    return mod, parts[-1].split("[")[0]
+
+
+def coverage(args):
+    led = _open(args.ledger)
+    rows = led.rows()
+    by_name, test_files = {}, {r["file"] for r in rows}
+    for r in rows:
+        by_name.setdefault(r["name"], []).append(r)
+
+    def dotted(f):
+        return re.sub(r"\.\w+$", "", f).replace("/", ".")
+
+    def match(ctx):
+        got = _cov_test(ctx)
+        if not got:
+            return None
+        mod, name = got
+        cands = by_name.get(name, ())
+        if len(cands) > 1 and mod:
+            cands = [r for r in cands if mod.endswith(dotted(r["file"]))
+                     or dotted(r["file"]).endswith(mod)] or cands
+        return cands[0]["id"] if len(cands) == 1 else None
+
+    def is_test_file(src):
+        parts = Path(src).parts
+        return (Path(src).name.startswith("conftest")
+                or any("/".join(parts[k:]) in test_files for k in range(len(parts))))
+
+    # pass 1: how many tests execute each source line
+    hits, ids, seen_src = {}, {}, {}
+    for ctx, src, lines in _cov_records(args.data):
+        if ctx not in ids:
+            ids[ctx] = match(ctx) if _cov_test(ctx) else False
+        if ids[ctx] is False:
+            continue
+        if src not in seen_src:
+            seen_src[src] = len(seen_src) if not is_test_file(src) else None
+        f = seen_src[src]
+        if f is None:
+            continue
+        for ln in lines:
+            hits[f, ln] = hits.get((f, ln), 0) + 1
+    # pass 2: score each matched test
+    score = {}
+    for ctx, src, lines in _cov_records(args.data):
+        rid, f = ids.get(ctx), seen_src.get(src)
+        if not rid or f is None:
             continue
-        print(f"\n## {label}\n")
-        for r in group:
-            ev = f" · evidence `{r['evidence']}`" if r["evidence"] else ""
-            sv = f" · {r['severity']}" if r["severity"] else ""
-            vf = f" · {r['verified']}" if r["verified"] else ""
-            print(f"- **`{r['id']}`** — {r['name']} "
-                  f"({r.get('pattern') or 'unclassified'}{sv}{vf}){ev}\n"
-                  f"  - {r['story'] or '(no story recorded)'}")
+        n, u = score.get(rid, (0, 0))
+        score[rid] = (n + len(lines), u + sum(1 for ln in lines if hits[f, ln] == 1))
+    for rid in {i for i in ids.values() if i}:
+        score.setdefault(rid, (0, 0))     # ran, but only test-file lines
+    changes = {}
+    for r in rows:
+        if r["id"] in score:
+            n, u = score[r["id"]]
+            rank = COV_NOTHING if not n else COV_SHARED if not u else COV_UNIQUE
+            changes[r["id"]] = {"cov_lines": n, "cov_unique": u, "cov_rank": rank}
+        elif r.get("cov_rank") is not None:       # stale, from an earlier ingest
+            changes[r["id"]] = {"cov_lines": None, "cov_unique": None, "cov_rank": None}
+    if changes:
+        led.update(changes, stamp=False)      # coverage is not a verdict
+    tests = sum(1 for i in ids.values() if i is not False)
+    unmatched = sum(1 for i in ids.values() if i is None)
+    ranks = [score[rid] for rid in score]
+    print(f"coverage: {len(score)} of {len(rows)} ledger rows matched "
+          f"({tests} test contexts, {unmatched} unmatched)")
+    print(f"ranks:    covers nothing={sum(1 for n, _ in ranks if not n)}  "
+          f"nothing unique={sum(1 for n, u in ranks if n and not u)}  "
+          f"unique lines={sum(1 for _, u in ranks if u)}")
+    if not tests:
+        print("no per-test contexts in that file — record them: pytest --cov "
+              "--cov-context=test, or coverage.py dynamic_context = test_function")
+
+
+# --------------------------------------------------------------------------- #
+# Mutation verification
+# --------------------------------------------------------------------------- #
+# A red verdict says "this test cannot fail". `verify` checks that claim the cheap
+# way mutation testing does: break the code the verdict's evidence points at in a
+# few small, syntax-preserving ways and rerun only that test. A test that passes on
+# the original and on every mutant is confirmed; one that fails on any mutant CAN
+# fail, so the verdict is refuted and goes back for a reread (the killing mutant is
+# recorded). The audited repo is never touched: each pool worker gets its own copy
+# (minus .git; dependency dirs are symlinked), mutates a file there, runs the test,
+# and restores it. Results are cached by (test body, target file, command), so
+# rerunning an audit only runs rows whose test or code changed.
+
+# the single test, per language, selected by its exact id — never a substring, or
+# `test_add` would also run `test_add_real`, and that test's failure on a mutant
+# would refute a verdict that was right. {path} is repo-relative, {dir} its
+# directory, {test_id} the name qualified by its class (pytest node id), inline
+# and file modules (Rust), and {name_re} the anchored full title under its
+# describe blocks (Jest)
+VERIFY_CMDS = {
+    "py":   "{python} -m pytest -x -q -p no:cacheprovider {test_id}",
+    "js":   "npx --no-install jest --runTestsByPath {path} -t {name_re}",
+    "go":   "go test -count=1 -run ^{name}$ ./{dir}",
+    "rb":   "bundle exec rspec {path}:{line}",
+    "rust": "cargo test -q {test_id} -- --exact",
+}
+# what a default command prints when the test really ran: an exact id that
+# selects nothing passes just as quietly, and every mutant would "survive"
+VERIFY_RAN = {
+    "py":   re.compile(r"\b[1-9]\d* passed\b"),
+    "js":   re.compile(r"\b[1-9]\d* passed\b"),
+    "go":   re.compile(r"^ok\b(?!.*\[no tests to run\])", re.M),
+    "rb":   re.compile(r"\b[1-9]\d* examples?, 0 failures"),
+    "rust": re.compile(r"\brunning [1-9]\d* tests?\b"),
+}
+# blocks a test's id is qualified by: Python classes, JS describe blocks, Rust mods
+SCOPE_RE = {
+    "py":   re.compile(r"^\s*class\s+(?P<name>\w+)"),
+    "js":   re.compile(r"^\s*(?:describe|context|suite)(?:\.(?:only|skip|concurrent))?"
+                       r"\s*\(\s*(?P<q>['\"`])(?P<name>.*?)(?P=q)"),
+    "rust": re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?mod\s+(?P<name>\w+)\s*\{"),
+}
+# Syntax-preserving operator swaps. Comparisons and arithmetic only match with
+# spaces around them so generics (`Vec<u8>`), arrows and unary minus are left alone
+# — a mutant that doesn't compile would "kill" every test and prove nothing.
+MUTATIONS = [(re.compile(p), to) for p, to in (
+    (r"(?<=\s)==(?=\s)", "!="), (r"(?<=\s)!=(?=\s)", "=="),
+    (r"(?<=\s)<=(?=\s)", ">"), (r"(?<=\s)>=(?=\s)", "<"),
+    (r"(?<=\s)<(?=\s)", ">="), (r"(?<=\s)>(?=\s)", "<="),
+    (r"(?<=\s)\+(?=\s)", "-"), (r"(?<=\s)-(?=\s)", "+"),
+    (r"(?<=\s)&&(?=\s)", "||"), (r"(?<=\s)\|\|(?=\s)", "&&"),
+    (r"\band\b", "or"), (r"\bor\b", "and"),
+    (r"\bTrue\b", "False"), (r"\bFalse\b", "True"),
+    (r"\btrue\b", "false"), (r"\bfalse\b", "true"),
+    (r"(?<![\w.])0(?![\w.])", "1"), (r"(?<![\w.])1(?![\w.])", "0"),
+)]
+SHARED_DIRS = ("node_modules", ".venv", "venv")     # symlinked into copies, not copied
+COMMENT = re.compile(r"\s*(?:#|//|/\*|\*|--)")
+EVIDENCE = re.compile(r"^`?(?P<file>[^`:\s]+):(?P<line>\d+)")
+
+
+def _mutants(text, line, window, limit, seed):
+    """Up to `limit` single-token mutants of the lines within `window` of 1-based
+    `line` → [(line, description, mutated text)], sampled deterministically."""
+    lines = text.splitlines(keepends=True)
+    found = []
+    for j in range(max(line - 1 - window, 0), min(line + window, len(lines))):
+        l = lines[j]
+        if COMMENT.match(l):
+            continue
+        for rx, to in MUTATIONS:
+            for m in rx.finditer(l):
+                if l.count('"', 0, m.start()) % 2 or l.count("'", 0, m.start()) % 2:
+                    continue              # inside a string literal, near enough
+                new = l[:m.start()] + to + l[m.end():]
+                found.append((j + 1, f"`{m.group()}`→`{to}`",
+                              "".join(lines[:j]) + new + "".join(lines[j + 1:])))
+    # prefer the evidence line itself, then sample the window
+    on = [m for m in found if m[0] == line]
+    off = [m for m in found if m[0] != line]
+    random.Random(seed).shuffle(on)
+    random.Random(seed).shuffle(off)
+    return (on + off)[:limit]
+
+
+_COPY = None                      # this pool worker's private copy of the repo
+
+
+def _verify_init(copies):
+    global _COPY
+    _COPY = copies.get()
+
+
+def _scopes(text, lang, line):
+    """Names of the blocks enclosing the test on 0-based `line` (see SCOPE_RE),
+    outermost first."""
+    pat = SCOPE_RE.get(lang)
+    if not pat:
+        return []
+    lines = text.splitlines()
+    starts = {}
+    for j, l in enumerate(lines[:line]):
+        m = pat.match(l)
+        if m:
+            starts[j] = m.group("name")
+    if not starts:
+        return []
+    if lang == "py":
+        ends = _indent_ends(lines, list(starts))
+    else:
+        offs = [0]
+        for l in text.splitlines(keepends=True):
+            offs.append(offs[-1] + len(l))
+        ends = _brace_ends(text, offs, list(starts), lang)
+    return [name for j, name in sorted(starts.items()) if ends[j] > line]
+
+
+def _rust_modules(path):
+    """Module path of a Rust source file within its crate: src/a/b.rs → [a, b].
+    Files outside src/ (tests/*.rs) and binaries are crate roots."""
+    parts = path.with_suffix("").parts
+    if "src" not in parts:
+        return []
+    parts = parts[len(parts) - parts[::-1].index("src"):]
+    if parts[-1:] in (("lib",), ("main",), ("mod",)):
+        parts = parts[:-1]
+    return [] if parts[:1] == ("bin",) else list(parts)
+
+
+def _test_ids(text, lang, path, line, name):
+    """→ (test_id, name_re): the exact ids VERIFY_CMDS select one test by."""
+    scopes = _scopes(text, lang, line)
+    if lang == "py":
+        test_id = "::".join([str(path), *scopes, name])
+    elif lang == "rust":
+        test_id = "::".join(_rust_modules(path) + scopes + [name])
+    else:
+        test_id = name
+    return test_id, "^" + re.escape(" ".join(scopes + [name]) if lang == "js" else name) + "$"
+
+
+def _run_test(cmd, timeout):
+    """True if the test passed; False if it failed or ran out of time."""
+    try:
+        return subprocess.run(cmd, cwd=_COPY, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL, timeout=timeout).returncode == 0
+    except subprocess.TimeoutExpired:
+        return False                  # a mutant that hangs the test has killed it
+    except OSError:
+        return None                   # the runner itself isn't installed
+
+
+def _baseline(cmd, timeout, ran):
+    """_run_test for the unmutated run, which must also show (per `ran`, if
+    given) that the command selected the test → True, False, None or
+    "not_selected"."""
+    if ran is None:
+        return _run_test(cmd, timeout)
+    try:
+        got = subprocess.run(cmd, cwd=_COPY, capture_output=True, text=True,
+                             errors="replace", timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return False
+    except OSError:
+        return None
+    if got.returncode != 0:
+        return False
+    return True if re.compile(ran, re.M).search(got.stdout + got.stderr) else "not_selected"
+
+
+def _verify_row(job):
+    """Baseline, then each mutant, in this worker's copy → the row's result."""
+    target = Path(_COPY) / job["target"]
+    orig = target.read_bytes()
+    passed = _baseline(job["cmd"], job["timeout"], job["ran"])
+    if passed is not True:
+        return {"outcome": {None: "no_runner", False: "baseline_failed"}.get(passed, passed),
+                "mutants": 0, "killed": [], "survived": []}
+    muts = _mutants(orig.decode("utf-8", errors="replace"), job["line"],
+                    job["window"], job["limit"], job["id"])
+    killed, survived = [], []
+    try:
+        for ln, desc, text in muts:
+            target.write_text(text)
+            desc = f'{job["target"]}:{ln} {desc}'
+            (survived if _run_test(job["cmd"], job["timeout"]) else killed).append(desc)
+    finally:
+        target.write_bytes(orig)
+    outcome = "killed" if killed else "survived" if survived else "no_mutants"
+    return {"outcome": outcome, "mutants": len(muts), "killed": killed, "survived": survived}
+
+
+def _copy_repo(repo, dst):
+    shared = {d for d in SHARED_DIRS if (repo / d).is_dir()}
+    shutil.copytree(repo, dst, symlinks=True,
+                    ignore=lambda d, names: {".git"} | (shared if d == str(repo) else set()))
+    for d in shared:
+        os.symlink(repo / d, dst / d)
+
+
+def verify(args):
+    root = Path(args.testdir).resolve()
+    if args.repo:
+        repo = Path(args.repo).resolve()
+    else:
+        got = subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=root,
+                             capture_output=True, text=True)
+        repo = Path(got.stdout.strip()) if got.returncode == 0 else root
+    if root != repo and repo not in root.parents:
+        sys.exit(f"verify: {root} is not inside --repo {repo}")
+    cmds = dict(VERIFY_CMDS)
+    for c in args.cmd or ():
+        lang, _, tmpl = c.partition("=")
+        if lang not in cmds or not tmpl:
+            sys.exit(f"--cmd wants LANG=TEMPLATE with LANG one of {', '.join(cmds)}")
+        cmds[lang] = tmpl
+    led = _open(args.ledger)
+    rows = [r for r in led.rows()
+            if (r["id"] in args.id if args.id else r["status"] in ("red", "yellow"))]
+    cache = _Cache(args.ledger)
+    jobs, results, skipped = [], {}, []
+    for r in rows[:args.limit] if args.limit else rows:
+        m = EVIDENCE.match(r.get("evidence") or "")
+        path = (root / r["file"]).relative_to(repo)
+        target = m and next((p.relative_to(repo) for p in (repo / m["file"], root / m["file"])
+                             if p.resolve().is_file()), None)
+        if not target:
+            skipped.append((r["id"], "evidence is not a file:line in the repo"))
+            continue
+        if target == path:
+            skipped.append((r["id"], "evidence points into the test itself — cite the "
+                                      "code under test"))
+            continue
+        test_id, name_re = _test_ids((root / r["file"]).read_text(errors="replace"),
+                                     r["lang"], path, r["line"] - 1, r["name"])
+        fields = {"python": sys.executable, "path": str(path), "dir": str(path.parent),
+                  "name": r["name"], "name_re": name_re, "test_id": test_id,
+                  "line": r["line"]}
+        cmd = [t.format(**fields) for t in shlex.split(cmds[r["lang"]])]
+        ran = VERIFY_RAN[r["lang"]] if cmds[r["lang"]] == VERIFY_CMDS[r["lang"]] else None
+        key = ":".join((r.get("body_hash") or "", _hash((repo / target).read_bytes()),
+                        _hash(json.dumps([cmd, m["line"], args.mutants, args.window]))))
+        hit = cache.get("verify", key)
+        if hit:
+            results[r["id"]] = hit
+            continue
+        jobs.append((key, {"id": r["id"], "target": str(target), "line": int(m["line"]),
+                           "cmd": cmd, "timeout": args.timeout, "window": args.window,
+                           "ran": ran and ran.pattern,
+                           "limit": args.mutants}))
+    print(f"verify: {len(rows)} rows; {len(results)} cached, {len(jobs)} to run, "
+          f"{len(skipped)} skipped  (repo {repo})")
+    if jobs:
+        workers = min(args.jobs, len(jobs))
+        with tempfile.TemporaryDirectory(prefix="ledger-verify-") as tmp, \
+                multiprocessing.Manager() as mgr:
+            copies = mgr.Queue()
+            for i in range(workers):
+                _copy_repo(repo, Path(tmp) / str(i))
+                copies.put(str(Path(tmp) / str(i)))
+            with ProcessPoolExecutor(workers, initializer=_verify_init,
+                                     initargs=(copies,)) as pool:
+                for (key, job), res in zip(jobs, pool.map(_verify_row, [j for _, j in jobs])):
+                    cache.put("verify", key, res)
+                    results[job["id"]] = res
+                    print(f'  {job["id"]}: {res["outcome"]} '
+                          f'({len(res["killed"])}/{res["mutants"]} mutants killed)')
+    cache.save()
+    changes = {}
+    for rid, res in results.items():
+        fields = {"verify": res}
+        if res["outcome"] in ("survived", "killed"):
+            fields["verified"] = "confirmed" if res["outcome"] == "survived" else "refuted"
+        changes[rid] = fields
+    if changes:
+        # a mutation result is not a reviewer's verdict: leave `rev` alone so
+        # `report --since` keeps showing only verdict changes
+        led.update(changes, stamp=False)
+    out = {}
+    for res in results.values():
+        out[res["outcome"]] = out.get(res["outcome"], 0) + 1
+    print("outcomes:  " + ("  ".join(f"{k}={v}" for k, v in sorted(out.items())) or "none"))
+    for rid, why in skipped:
+        print(f"  skipped {rid}: {why}")
+    refuted = [rid for rid, res in results.items() if res["outcome"] == "killed"]
+    if refuted:
+        print(f"\n{len(refuted)} verdict(s) refuted — the test failed on a mutant, so it "
+              f"can fail. Reread them:\n" + "\n".join(f"  {rid}" for rid in refuted))
 
 
 # --------------------------------------------------------------------------- #
@@ -436,9 +2125,15 @@ def main():
                                  formatter_class=argparse.RawDescriptionHelpFormatter)
     sub = ap.add_subparsers(dest="cmd", required=True)
 
-    b = sub.add_parser("build", help="enumerate tests into a JSONL ledger")
+    b = sub.add_parser("build", help="enumerate tests into a ledger (.jsonl or .db)")
     b.add_argument("testdir")
     b.add_argument("--out", required=True, help="ledger path (in scratch, NOT the repo)")
+    b.add_argument("--parser", choices=["regex", "ast"], default="regex",
+                   help="how to enumerate Python tests: regex (default) or the stdlib "
+                        "ast — exact spans, real assertion counts, parametrize cases")
+    b.add_argument("--update", action="store_true",
+                   help="rescan only files whose content changed; keep verdicts "
+                        "on tests whose body is unchanged")
     b.set_defaults(fn=build)
 
     s = sub.add_parser("stats", help="progress: counts by status/priority")
@@ -450,24 +2145,78 @@ def main():
     n.add_argument("--priority", choices=["high", "med", "low"])
     n.add_argument("--flag")
     n.add_argument("--limit", type=int, default=25)
+    n.add_argument("--claim", action="store_true",
+                   help="lease the batch to --worker (status in_progress) so parallel "
+                        "workers never draw the same rows")
+    n.add_argument("--worker", help="worker name holding the lease")
+    n.add_argument("--lease", type=int, default=LEASE_SECONDS,
+                   help=f"lease length in seconds (default {LEASE_SECONDS}); an expired "
+                        f"lease puts the rows back in the queue")
     n.set_defaults(fn=nxt)
 
     st = sub.add_parser("set", help="record a verdict on one row")
     st.add_argument("ledger")
     st.add_argument("id")
-    st.add_argument("--status", required=True,
-                    choices=["red", "yellow", "green", "skip", "pending"])
+    st.add_argument("--status", required=True, choices=STATUSES)
     st.add_argument("--pattern")
     st.add_argument("--severity")
     st.add_argument("--evidence", help="file:line the verdict rests on")
     st.add_argument("--story", help="failure story (required for red/yellow)")
-    st.add_argument("--verified", choices=["read", "confirmed"])
+    st.add_argument("--verified", choices=VERIFIED)
+    st.add_argument("--worker", help="refuse if another worker holds a live claim on the row")
+    st.add_argument("--cluster", action="store_true",
+                    help="also record this verdict on every pending row in the same "
+                         "copy-paste cluster (marked propagated_from)")
     st.set_defaults(fn=_set)
 
+    ap_ = sub.add_parser("apply", help="record a batch of verdicts (JSONL) in one write")
+    ap_.add_argument("ledger")
+    ap_.add_argument("verdicts", help='JSONL file, or - for stdin: one {"id": ..., '
+                                      '"status": ..., ...} per line, fields as for set')
+    ap_.add_argument("--worker", help="refuse rows another worker holds a live claim on")
+    ap_.set_defaults(fn=apply)
+
     r = sub.add_parser("report", help="emit a markdown verdict from the ledger")
     r.add_argument("ledger")
+    r.add_argument("--out-dir", help="write index.md plus one markdown shard per test "
+                                     "directory here (scratch, NOT the repo)")
+    r.add_argument("--since", type=int, metavar="REV",
+                   help="only findings whose verdict was written after ledger revision "
+                        "REV (see `stats` / the report header for the current one)")
     r.set_defaults(fn=report)
 
+    c = sub.add_parser("convert", help="import/export a ledger between .jsonl and "
+                                       "SQLite (.db) — format follows the extension")
+    c.add_argument("src")
+    c.add_argument("dst")
+    c.set_defaults(fn=convert)
+
+    cv = sub.add_parser("coverage", help="rank the queue by per-test coverage: tests "
+                                         "that cover nothing (unique) come first")
+    cv.add_argument("ledger")
+    cv.add_argument("data", help="coverage.py data file (.coverage, recorded with "
+                                 "per-test contexts) or an lcov tracefile with TN: names")
+    cv.set_defaults(fn=coverage)
+
+    v = sub.add_parser("verify", help="mutation-check red/yellow verdicts by rerunning "
+                                      "their test against mutated code (in a temp copy)")
+    v.add_argument("ledger")
+    v.add_argument("testdir", help="the directory the ledger was built from")
+    v.add_argument("--repo", help="repo root to copy (default: git toplevel of testdir)")
+    v.add_argument("--id", action="append", help="verify only this row (repeatable); "
+                                                 "default: every red/yellow row")
+    v.add_argument("--limit", type=int, help="verify at most N rows")
+    v.add_argument("--mutants", type=int, default=6, help="mutants per row (default 6)")
+    v.add_argument("--window", type=int, default=3,
+                   help="mutate lines within N of the evidence line (default 3)")
+    v.add_argument("--timeout", type=int, default=120, help="seconds per test run")
+    v.add_argument("--jobs", type=int, default=min(os.cpu_count() or 1, 4),
+                   help="parallel workers, each with its own repo copy")
+    v.add_argument("--cmd", action="append", metavar="LANG=TEMPLATE",
+                   help="override a language's single-test command; fields {python} "
+                        "{path} {dir} {name} {name_re} {test_id} {line}")
+    v.set_defaults(fn=verify)
+
     args = ap.parse_args()
     args.fn(args)
 
@@ -10,13 +10,22 @@ Usage:
     python3 preflight.py <site-dir>
 
 Exit status: 0 if clean, 1 if there are errors.
+
+Parsed references are cached per page, keyed by (path, mtime, size), under
+~/.cache/github-pages-deploy/ (never in the site, which gets published), so a
+re-run after editing one page re-parses only that page.
 """
 
 from __future__ import annotations
 
+import fnmatch
+import hashlib
+import json
 import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from html.parser import HTMLParser
 from pathlib import Path
 from urllib.parse import unquote, urlparse
@@ -31,6 +40,10 @@ URL_ATTRS = {
 MAX_BLOB_BYTES = 100 * 1024 * 1024  # git hard-rejects pushes above this
 CSS_URL_RE = re.compile(r"""url\(\s*['"]?([^'")]+)['"]?\s*\)""", re.IGNORECASE)
 
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "github-pages-deploy"
+CACHE_VERSION = 1          # bump when RefCollector changes what it collects
+PARALLEL_MIN_FILES = 64    # below this, starting a process pool costs more than it saves
+
 
 class RefCollector(HTMLParser):
     """Pull every candidate local-file reference out of an HTML document."""
@@ -67,6 +80,98 @@ class RefCollector(HTMLParser):
             self.refs += [(m.group(1), line) for m in CSS_URL_RE.finditer(data)]
 
 
+def parse_html(path: str) -> tuple[list[tuple[str, int]], str | None]:
+    """Collect one page's references, plus the parse error if it stopped early.
+
+    Module-level so a process pool can run it.
+    """
+    collector = RefCollector()
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            collector.feed(f.read())
+    except Exception as exc:  # malformed HTML shouldn't abort the audit
+        return collector.refs, str(exc)
+    return collector.refs, None
+
+
+def scan_site(site_dir: Path) -> dict[str, tuple[int, int]]:
+    """Walk the site once: {relative path: (size, mtime_ns)} for every file outside .git."""
+    files: dict[str, tuple[int, int]] = {}
+    for dirpath, dirnames, filenames in os.walk(site_dir):
+        dirnames[:] = sorted(d for d in dirnames if d != ".git")
+        for name in sorted(filenames):
+            if name == ".git":
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:  # dangling symlink
+                continue
+            files[os.path.relpath(path, site_dir)] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def _cache_path(site_dir: Path) -> Path:
+    digest = hashlib.sha1(str(site_dir).encode()).hexdigest()[:16]
+    return CACHE_DIR / f"preflight-{digest}.json"
+
+
+def _load_cache(site_dir: Path) -> dict:
+    try:
+        with open(_cache_path(site_dir)) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache.get("files", {}) if cache.get("version") == CACHE_VERSION else {}
+
+
+def _save_cache(site_dir: Path, files: dict) -> None:
+    path = _cache_path(site_dir)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": CACHE_VERSION, "files": files}, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # the cache only saves time; an unwritable one isn't an audit failure
+
+
+def collect_refs(
+    site_dir: Path, html: list[str], files: dict[str, tuple[int, int]]
+) -> dict[str, tuple[list[tuple[str, int]], str | None]]:
+    """References of every page in `html`, from the cache where the page is
+    unchanged and parsed (in parallel, when there are many) where it isn't."""
+    cache = _load_cache(site_dir)
+    results: dict[str, tuple[list[tuple[str, int]], str | None]] = {}
+    todo: list[str] = []
+    for rel in html:
+        size, mtime = files[rel]
+        hit = cache.get(rel)
+        if hit and hit[0] == size and hit[1] == mtime:
+            results[rel] = ([tuple(r) for r in hit[2]], hit[3])
+        else:
+            todo.append(rel)
+
+    paths = [str(site_dir / rel) for rel in todo]
+    parsed = None
+    if len(todo) >= PARALLEL_MIN_FILES:
+        try:
+            with ProcessPoolExecutor() as pool:
+                parsed = list(pool.map(parse_html, paths, chunksize=32))
+        except (OSError, BrokenProcessPool):  # no usable multiprocessing here
+            parsed = None
+    if parsed is None:
+        parsed = [parse_html(path) for path in paths]
+    results.update(zip(todo, parsed))
+
+    if todo or len(cache) != len(html):
+        _save_cache(site_dir, {
+            rel: [*files[rel], refs, error] for rel, (refs, error) in results.items()
+        })
+    return results
+
+
 def is_local(url: str) -> bool:
     """True when the reference points at a file we have to publish."""
     url = url.strip()
@@ -76,13 +181,16 @@ def is_local(url: str) -> bool:
     return not parsed.scheme and not parsed.netloc
 
 
-def resolve_case_sensitively(root: Path, rel: str) -> tuple[bool, str | None]:
+def resolve_case_sensitively(
+    root: Path, rel: str, listings: dict[Path, tuple[list[str], set[str]]] | None = None
+) -> tuple[bool, str | None]:
     """Resolve `rel` under `root` the way a case-sensitive server would.
 
     Returns (exists_exactly, actual_path_if_only_the_case_differs). Walking
     segment by segment against real directory listings is what catches
     `assets/Logo.png` vs `assets/logo.png`, where a plain exists() check lies
-    on macOS.
+    on macOS. Pass a dict as `listings` to reuse directory listings across
+    calls.
     """
     current = root
     for part in Path(rel).parts:
@@ -92,10 +200,17 @@ def resolve_case_sensitively(root: Path, rel: str) -> tuple[bool, str | None]:
             current = current.parent
             continue
         try:
-            entries = os.listdir(current)
+            if listings is None:
+                entries = os.listdir(current)
+                names = set(entries)
+            else:
+                if current not in listings:
+                    entries = os.listdir(current)
+                    listings[current] = (entries, set(entries))
+                entries, names = listings[current]
         except (NotADirectoryError, FileNotFoundError, PermissionError):
             return False, None
-        if part in entries:
+        if part in names:
             current = current / part
             continue
         matches = [e for e in entries if e.lower() == part.lower()]
@@ -115,16 +230,16 @@ def audit(site_dir: Path) -> tuple[list[str], list[str]]:
             "without it the whole site returns 404."
         )
 
-    html_files = sorted(p for p in site_dir.rglob("*.htm*") if ".git" not in p.parts)
+    # One walk gathers sizes, Jekyll-hidden paths and the HTML list together.
+    files = scan_site(site_dir)
+    html_files = sorted(rel for rel in files if fnmatch.fnmatchcase(os.path.basename(rel), "*.htm*"))
     if not html_files:
         errors.append(f"No HTML files found under {site_dir}.")
 
     jekyll_paths: set[str] = set()
-    for path in site_dir.rglob("*"):
-        if ".git" in path.parts or not path.is_file():
-            continue
-        rel = path.relative_to(site_dir)
-        if path.stat().st_size > MAX_BLOB_BYTES:
+    for rel_str, (size, _) in sorted(files.items()):
+        rel = Path(rel_str)
+        if size > MAX_BLOB_BYTES:
             errors.append(f"{rel} is over 100 MB; git will reject the push.")
         if any(p.startswith("_") or (p.startswith(".") and p != ".nojekyll") for p in rel.parts):
             jekyll_paths.add(str(rel))
@@ -136,16 +251,17 @@ def audit(site_dir: Path) -> tuple[list[str], list[str]]:
             "these; deploy.sh writes a .nojekyll file, which fixes it."
         )
 
+    page_refs = collect_refs(site_dir, html_files, files)
+    listings: dict[Path, tuple[list[str], set[str]]] = {}
+    resolved: dict[str, tuple[bool, str | None]] = {}  # many pages share the same assets
     for html in html_files:
-        rel_html = html.relative_to(site_dir)
-        collector = RefCollector()
-        try:
-            collector.feed(html.read_text(encoding="utf-8", errors="replace"))
-        except Exception as exc:  # malformed HTML shouldn't abort the audit
-            notes.append(f"Could not fully parse {rel_html}: {exc}")
+        rel_html = Path(html)
+        refs, parse_error = page_refs[html]
+        if parse_error is not None:
+            notes.append(f"Could not fully parse {rel_html}: {parse_error}")
 
         seen: set[str] = set()
-        for raw, line in collector.refs:
+        for raw, line in refs:
             url = raw.strip()
             if not is_local(url) or url in seen:
                 continue
@@ -164,7 +280,9 @@ def audit(site_dir: Path) -> tuple[list[str], list[str]]:
             else:
                 lookup = (rel_html.parent / target).as_posix()
 
-            exists, cased = resolve_case_sensitively(site_dir, lookup)
+            if lookup not in resolved:
+                resolved[lookup] = resolve_case_sensitively(site_dir, lookup, listings)
+            exists, cased = resolved[lookup]
             if cased is not None:
                 errors.append(
                     f"{rel_html}:{line} references '{url}' but the file on disk is "
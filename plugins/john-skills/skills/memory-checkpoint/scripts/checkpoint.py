@@ -3,71 +3,49 @@
 
 import argparse
 import json
-import os
-import subprocess
 import sys
 from datetime import datetime
 from pathlib import Path
 
-# Setup and use skill venv
-SKILL_DIR = Path(__file__).parent.parent
-VENV_PYTHON = SKILL_DIR / ".venv" / "bin" / "python3"
-SETUP_SCRIPT = SKILL_DIR / "scripts" / "setup.sh"
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from store import append_checkpoint, get_project_checkpoint_dir  # noqa: E402
+from embed import embed_pending, embed_texts, server_running  # noqa: E402
+from global_index import register_project  # noqa: E402
+from lexical import index_checkpoint  # noqa: E402
+from sections import section_texts, split_sections  # noqa: E402
+from skill_env import require  # noqa: E402
 
-if not VENV_PYTHON.exists() and SETUP_SCRIPT.exists():
-    print("Setting up venv (first run)...", file=sys.stderr)
-    subprocess.run(["bash", str(SETUP_SCRIPT)], check=True)
-
-if VENV_PYTHON.exists() and sys.executable != str(VENV_PYTHON):
-    os.execv(str(VENV_PYTHON), [str(VENV_PYTHON)] + sys.argv)
-
-def get_project_checkpoint_dir(project_dir: str | None = None) -> Path:
-    """Get the checkpoint directory for the current project."""
-    if project_dir:
-        checkpoint_dir = Path(project_dir) / ".claude" / "checkpoints"
-    else:
-        checkpoint_dir = Path.cwd() / ".claude" / "checkpoints"
-
-    checkpoint_dir.mkdir(parents=True, exist_ok=True)
-    return checkpoint_dir
-
-def load_index(checkpoint_dir: Path) -> dict:
-    """Load or create the checkpoint index."""
-    index_path = checkpoint_dir / "index.json"
-    if index_path.exists():
-        with open(index_path) as f:
-            return json.load(f)
-    return {"checkpoints": []}
-
-def save_index(checkpoint_dir: Path, index: dict) -> None:
-    """Save the checkpoint index."""
-    index_path = checkpoint_dir / "index.json"
-    with open(index_path, "w") as f:
-        json.dump(index, f, indent=2)
-
-def generate_embedding(text: str) -> list[float]:
-    """Generate embedding using FastEmbed."""
+def generate_embeddings(texts: list[str]) -> list[list[float]]:
+    """Embed all texts in one batch using FastEmbed (via the warm server when it is running)."""
     try:
-        from fastembed import TextEmbedding
-        model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
-        embeddings = list(model.embed([text]))
-        return embeddings[0].tolist()
+        return embed_texts(texts)
     except ImportError:
         print("Warning: fastembed not installed. Run: pip install fastembed", file=sys.stderr)
         return []
 
-def create_checkpoint(content: str, auto: bool = False, project_dir: str | None = None) -> dict:
-    """Create a checkpoint file and add to index."""
-    checkpoint_dir = get_project_checkpoint_dir(project_dir)
+def create_checkpoint(content: str, auto: bool = False, project_dir: str | None = None,
+                      defer: bool = False) -> dict:
+    """Create a checkpoint file and add to index. With defer, skip the embedding
+    (and the model load) and mark the entry pending for a later batch."""
+    checkpoint_dir = get_project_checkpoint_dir(project_dir, create=True)
 
     # Generate timestamp
     timestamp = datetime.now()
-    filename = timestamp.strftime("%Y-%m-%dT%H-%M-%S") + ".md"
-    filepath = checkpoint_dir / filename
-
-    # Write checkpoint content
-    with open(filepath, "w") as f:
-        f.write(content)
+    stem = timestamp.strftime("%Y-%m-%dT%H-%M-%S")
+
+    # Write checkpoint content; a hook firing in the same second gets its own file
+    for n in range(1, 1000):
+        filename = f"{stem}.md" if n == 1 else f"{stem}-{n}.md"
+        filepath = checkpoint_dir / filename
+        try:
+            with open(filepath, "x") as f:
+                f.write(content)
+            break
+        except FileExistsError:
+            continue
+    else:
+        sys.exit(f"Error: {checkpoint_dir} already holds 999 checkpoints named {stem}*; "
+                 "nothing written")
 
     # Extract summary for index (first non-empty line after # Checkpoint)
     lines = content.split("\n")
@@ -85,37 +63,62 @@ def create_checkpoint(content: str, auto: bool = False, project_dir: str | None
                     break
             break
 
-    # Generate embedding from content
-    embedding = generate_embedding(content)
+    # Embed each section, so later ones (Decisions, Next Steps) aren't lost to truncation
+    chunks = split_sections(content)
+    embeddings = [] if defer else generate_embeddings(section_texts(content, chunks))
 
-    # Update index
-    index = load_index(checkpoint_dir)
-    entry = {
+    # Append to the index; vectors go to the binary sidecar, the entry keeps its first row
+    append_checkpoint(checkpoint_dir, {
         "timestamp": timestamp.isoformat(),
         "filename": filename,
         "status": status,
         "summary": summary[:200],
         "auto": auto,
-        "embedding": embedding
-    }
-    index["checkpoints"].append(entry)
-    save_index(checkpoint_dir, index)
+        "chunks": chunks,
+        "pending": not embeddings               # embedded by the next flush or search
+    }, embeddings)
+    index_checkpoint(checkpoint_dir, filename, content, chunks)
+    register_project(project_dir)
 
     return {
         "filepath": str(filepath),
         "timestamp": timestamp.isoformat(),
         "status": status,
         "summary": summary,
-        "has_embedding": bool(embedding)
+        "has_embedding": bool(embeddings),
+        "sections": len(chunks)
     }
 
+def flush_embeddings(project_dir: str | None = None) -> dict:
+    """Embed all pending checkpoints in one batch."""
+    try:
+        flushed = embed_pending(get_project_checkpoint_dir(project_dir))
+    except ImportError:
+        print("Error: fastembed not installed. Run: pip install fastembed", file=sys.stderr)
+        sys.exit(1)
+    return {"flushed": flushed}
+
 def main():
     parser = argparse.ArgumentParser(description="Create a session checkpoint")
-    parser.add_argument("--auto", action="store_true", help="Mark as auto-generated (e.g., from hook)")
+    parser.add_argument("--auto", action="store_true",
+                        help="Mark as auto-generated (e.g., from hook); implies --defer")
+    parser.add_argument("--defer", action="store_true",
+                        help="Save now, embed later (next search or --flush-embeddings)")
+    parser.add_argument("--flush-embeddings", action="store_true",
+                        help="Embed all deferred checkpoints in one batch, then exit")
     parser.add_argument("--content", type=str, help="Checkpoint content (reads from stdin if not provided)")
     parser.add_argument("--project-dir", type=str, help="Project root directory (defaults to cwd)")
     args = parser.parse_args()
 
+    # Only embedding in this process needs the venv; deferred checkpoints and the
+    # warm server's clients run on the stdlib
+    if (args.flush_embeddings or not (args.auto or args.defer)) and not server_running():
+        require("numpy", "fastembed")
+
+    if args.flush_embeddings:
+        print(json.dumps(flush_embeddings(args.project_dir), indent=2))
+        return
+
     if args.content:
         content = args.content
     else:
@@ -126,7 +129,8 @@ def main():
         print("Error: No checkpoint content provided", file=sys.stderr)
         sys.exit(1)
 
-    result = create_checkpoint(content, auto=args.auto, project_dir=args.project_dir)
+    result = create_checkpoint(content, auto=args.auto, project_dir=args.project_dir,
+                               defer=args.auto or args.defer)
     print(json.dumps(result, indent=2))
 
 if __name__ == "__main__":
@@ -0,0 +1,161 @@
+"""Text embeddings for the memory-checkpoint scripts.
+
+Loading the ONNX model costs seconds; one embedding costs milliseconds. When
+embed_server.py is running it keeps the model warm on a Unix socket, and
+embed_texts() asks it first. If nothing is listening, the model is loaded in
+this process as before. Either way, texts embedded before come from the
+persistent cache (embed_cache.py) without inference. The client side is
+stdlib only.
+
+Wire format, one exchange per connection: the client sends a JSON line
+{"texts": [...]}; the server answers with a JSON line {"model", "count", "dim"}
+(or {"error"}) followed by count*dim float32 values.
+
+The socket lives in a directory only this user can enter ($XDG_RUNTIME_DIR, or
+~/.cache/memory-checkpoint created 0700), and both sides refuse a path that
+isn't a socket owned by this user, so checkpoint text never goes to a socket
+another local user put there.
+"""
+
+import json
+import os
+import socket
+import stat
+import struct
+from array import array
+from pathlib import Path
+
+import embed_cache
+from sections import section_texts
+from store import attach_embeddings, load_index, read_checkpoint
+
+MODEL_NAME = "BAAI/bge-small-en-v1.5"
+SOCKET_DIR = (Path(os.environ["XDG_RUNTIME_DIR"]) / "memory-checkpoint" if os.environ.get("XDG_RUNTIME_DIR")
+              else Path.home() / ".cache" / "memory-checkpoint")
+SOCKET_PATH = Path(os.environ.get("MEMORY_CHECKPOINT_SOCKET") or SOCKET_DIR / "embed.sock")
+CONNECT_TIMEOUT = 0.5
+REPLY_TIMEOUT = 60.0
+
+def load_model():
+    """Load the embedding model in this process (raises ImportError without fastembed)."""
+    from fastembed import TextEmbedding
+    return TextEmbedding(model_name=MODEL_NAME)
+
+_model = None  # loaded at most once per process (a search may flush pending checkpoints first)
+
+def embed_local(texts: list[str], model=None) -> list[list[float]]:
+    """Embed in this process; vectors are L2-normalized."""
+    global _model
+    if model is None:
+        _model = _model or load_model()
+        model = _model
+    vectors = []
+    for embedding in model.embed(texts):
+        norm = float((embedding * embedding).sum()) ** 0.5
+        vectors.append((embedding / norm if norm else embedding).tolist())
+    return vectors
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(min(n - len(buf), 1 << 20))
+        if not chunk:
+            raise ConnectionError("embedding server closed the connection")
+        buf += chunk
+    return bytes(buf)
+
+def socket_is_ours(path: Path = SOCKET_PATH) -> bool:
+    """Whether path is a Unix socket owned by this user (not following symlinks)."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+def connect(timeout: float = CONNECT_TIMEOUT) -> socket.socket | None:
+    """A connection to the warm server, or None if there is none we trust."""
+    if not socket_is_ours():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(str(SOCKET_PATH))
+        if hasattr(socket, "SO_PEERCRED"):     # Linux: the process listening must be us too
+            creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+            if struct.unpack("3i", creds)[1] != os.getuid():
+                raise ConnectionRefusedError("embedding server runs as another user")
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+def server_running() -> bool:
+    """Whether a warm server is accepting connections (no embedding requested)."""
+    sock = connect()
+    if sock is None:
+        return False
+    sock.close()
+    return True
+
+def embed_remote(texts: list[str]) -> list[list[float]] | None:
+    """Embed via the warm server, or None if it isn't running (or fails)."""
+    sock = connect()
+    if sock is None:
+        return None
+    try:
+        with sock:
+            sock.settimeout(REPLY_TIMEOUT)
+            sock.sendall(json.dumps({"texts": texts}).encode() + b"\n")
+            header = b""
+            while not header.endswith(b"\n"):
+                chunk = sock.recv(1)
+                if not chunk:
+                    return None
+                header += chunk
+            meta = json.loads(header)
+            if meta.get("error") or meta.get("model") != MODEL_NAME:
+                return None
+            values = array("f")
+            values.frombytes(_recv_exact(sock, 4 * meta["count"] * meta["dim"]))
+    except (OSError, ValueError):
+        return None
+    dim = meta["dim"]
+    return [values[i * dim:(i + 1) * dim].tolist() for i in range(meta["count"])]
+
+def embed_texts(texts: list[str]) -> list[list[float]]:
+    """L2-normalized embeddings for texts: from the cache, then (for the rest,
+    in one batch) from the warm server when it's up, otherwise from a model
+    loaded here (ImportError if fastembed is missing)."""
+    if not texts:
+        return []
+    texts = [embed_cache.normalize(t) for t in texts]
+    vectors = embed_cache.lookup(MODEL_NAME, texts)
+    batch = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+    if batch:
+        fresh = embed_remote(batch)
+        if fresh is None:
+            fresh = embed_local(batch)
+        embed_cache.store(MODEL_NAME, batch, fresh)
+        fresh = dict(zip(batch, fresh))
+        vectors = [fresh[t] if v is None else v for t, v in zip(texts, vectors)]
+    return vectors
+
+def embed_pending(checkpoint_dir: Path) -> int:
+    """Embed every checkpoint saved with a deferred embedding, all sections in one
+    batch, and attach the vectors; returns how many were done. Raises
+    ImportError (before touching anything) if no model is available."""
+    pending = [c for c in load_index(checkpoint_dir)["checkpoints"] if c.get("pending")]
+    texts, owners = [], []
+    for checkpoint in pending:
+        content = read_checkpoint(checkpoint_dir, checkpoint["filename"])
+        if not content:
+            continue
+        chunk_texts = section_texts(content, checkpoint.get("chunks") or [[0, len(content), ""]])
+        texts.extend(chunk_texts)
+        owners.extend([checkpoint["filename"]] * len(chunk_texts))
+    if not texts:
+        return 0
+    vectors = {}
+    for name, vector in zip(owners, embed_texts(texts)):
+        vectors.setdefault(name, []).append(vector)
+    return attach_embeddings(checkpoint_dir, vectors)
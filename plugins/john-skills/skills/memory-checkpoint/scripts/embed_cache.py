@@ -0,0 +1,72 @@
+"""Persistent embedding cache: (model, normalized text) -> vector, LRU-bounded.
+
+Repeated auto checkpoints of an unchanged section, a flush re-embedding text
+seen before, and a retried query all hit the same texts; with this they skip
+inference (and, without the warm server, the model load). Texts are keyed
+after collapsing whitespace, which the tokenizer ignores anyway. The cache is
+one SQLite file per user, shared by all projects; once it holds more than
+MAX_ENTRIES vectors the least recently used are dropped. It is an
+optimization only: if the file can't be opened or written, callers just
+embed as if it were empty.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from array import array
+from contextlib import closing
+from pathlib import Path
+
+CACHE_PATH = Path(os.environ.get("MEMORY_CHECKPOINT_CACHE")
+                  or Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+                  / "memory-checkpoint" / "embeddings.db")
+MAX_ENTRIES = 20_000   # ~30 MB of 384-dim float32
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, vector BLOB, used REAL);
+CREATE INDEX IF NOT EXISTS vectors_used ON vectors (used);
+"""
+
+def normalize(text: str) -> str:
+    return " ".join(text.split())
+
+def _key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+def _connect() -> sqlite3.Connection:
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(str(CACHE_PATH), timeout=5, isolation_level=None)
+    db.execute("PRAGMA journal_mode = WAL")
+    db.executescript(SCHEMA)
+    return db
+
+def lookup(model: str, texts: list[str]) -> list[list[float] | None]:
+    """Cached vectors for texts (None where missing), marking hits as used."""
+    keys = [_key(model, normalize(t)) for t in texts]
+    try:
+        with closing(_connect()) as db:
+            found = {}
+            for start in range(0, len(keys), 500):      # stay under SQLite's variable limit
+                batch = keys[start:start + 500]
+                marks = ",".join("?" * len(batch))
+                found.update(db.execute(f"SELECT key, vector FROM vectors WHERE key IN ({marks})", batch))
+                db.execute(f"UPDATE vectors SET used = ? WHERE key IN ({marks})", [time.time(), *batch])
+    except sqlite3.Error:
+        return [None] * len(texts)
+    return [array("f", found[k]).tolist() if k in found else None for k in keys]
+
+def store(model: str, texts: list[str], vectors: list[list[float]]) -> None:
+    """Remember vectors for texts, evicting the least recently used beyond MAX_ENTRIES."""
+    now = time.time()
+    rows = [(_key(model, normalize(t)), array("f", v).tobytes(), now) for t, v in zip(texts, vectors)]
+    try:
+        with closing(_connect()) as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?, ?)", rows)
+            excess = db.execute("SELECT COUNT(*) FROM vectors").fetchone()[0] - MAX_ENTRIES
+            if excess > 0:
+                db.execute("DELETE FROM vectors WHERE key IN "
+                           "(SELECT key FROM vectors ORDER BY used LIMIT ?)", (excess,))
+            db.execute("COMMIT")
+    except sqlite3.Error:
+        pass
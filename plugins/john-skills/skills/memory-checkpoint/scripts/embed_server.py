@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Keep the embedding model warm on a Unix socket for checkpoint.py and search.py.
+
+Optional: without it each script loads the model itself (seconds per call).
+With it, a checkpoint or search call spends milliseconds on the embedding.
+The server exits by itself after --idle-timeout seconds without requests.
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from embed import (MODEL_NAME, SOCKET_PATH, connect, embed_local, embed_remote,  # noqa: E402
+                   load_model, socket_is_ours)
+from skill_env import require  # noqa: E402
+
+class EmbedHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        server.last_request = time.monotonic()
+        try:
+            request = json.loads(self.rfile.readline())
+            if request.get("shutdown"):
+                threading.Thread(target=server.shutdown, daemon=True).start()
+                self.wfile.write(b'{"stopped": true}\n')
+                return
+            texts = request["texts"]
+            with server.lock:
+                vectors = embed_local(texts, server.model)
+        except Exception as e:  # report to the client, keep serving
+            self.wfile.write(json.dumps({"error": str(e)}).encode() + b"\n")
+            return
+        import numpy as np
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        header = {"model": MODEL_NAME, "count": matrix.shape[0], "dim": matrix.shape[1]}
+        self.wfile.write(json.dumps(header).encode() + b"\n")
+        self.wfile.write(matrix.tobytes())
+
+class EmbedServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(idle_timeout: float) -> None:
+    """Load the model, then answer embedding requests until idle for too long."""
+    SOCKET_PATH.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if SOCKET_PATH.parent.stat().st_uid != os.getuid():
+        sys.exit(f"Error: {SOCKET_PATH.parent} belongs to another user; not listening there")
+    SOCKET_PATH.parent.chmod(0o700)               # may predate us with the default mode
+    if socket_is_ours():
+        SOCKET_PATH.unlink()                      # stale socket from a dead server
+    elif os.path.lexists(SOCKET_PATH):
+        sys.exit(f"Error: {SOCKET_PATH} exists and is not this user's socket; not touching it")
+    model = load_model()
+    old_umask = os.umask(0o177)                   # socket readable by this user only
+    try:
+        server = EmbedServer(str(SOCKET_PATH), EmbedHandler)
+    finally:
+        os.umask(old_umask)
+    server.model, server.lock = model, threading.Lock()
+    server.last_request = time.monotonic()
+
+    def watch_idle():
+        while time.monotonic() - server.last_request < idle_timeout:
+            time.sleep(min(idle_timeout, 30))
+        server.shutdown()
+
+    threading.Thread(target=watch_idle, daemon=True).start()
+    print(f"Embedding server ready on {SOCKET_PATH} ({MODEL_NAME})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if socket_is_ours():
+            SOCKET_PATH.unlink()
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm embedding server for memory-checkpoint")
+    parser.add_argument("--detach", action="store_true", help="Start in the background and return once it is ready")
+    parser.add_argument("--status", action="store_true", help="Report whether a server is answering")
+    parser.add_argument("--stop", action="store_true", help="Stop a running server")
+    parser.add_argument("--idle-timeout", type=float, default=1800, help="Exit after this many idle seconds (default: 1800)")
+    args = parser.parse_args()
+
+    running = embed_remote(["ping"]) is not None
+    if args.status:
+        print(json.dumps({"running": running, "socket": str(SOCKET_PATH)}))
+        return
+    if args.stop:
+        sock = connect() if running else None
+        if sock is not None:
+            with sock:
+                sock.settimeout(None)
+                sock.sendall(b'{"shutdown": true}\n')
+                sock.recv(64)
+        print(json.dumps({"stopped": running}))
+        return
+    if running:
+        print(f"Embedding server already running on {SOCKET_PATH}", file=sys.stderr)
+        return
+    require("numpy", "fastembed")
+    if args.detach:
+        subprocess.Popen([sys.executable, __file__, "--idle-timeout", str(args.idle_timeout)],
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL, start_new_session=True)
+        for _ in range(600):                      # model load can take a while on first run
+            if embed_remote(["ping"]) is not None:
+                print(f"Embedding server ready on {SOCKET_PATH}", file=sys.stderr)
+                return
+            time.sleep(0.1)
+        print("Error: embedding server did not come up", file=sys.stderr)
+        sys.exit(1)
+    serve(args.idle_timeout)
+
+if __name__ == "__main__":
+    main()
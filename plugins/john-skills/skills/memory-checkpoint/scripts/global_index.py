@@ -0,0 +1,318 @@
+"""Machine-wide checkpoint search: one IVF index over every project's sections.
+
+Projects register themselves (projects.txt) when they save or search
+checkpoints. search() first syncs: any project whose embeddings.f32 grew since
+the last sync has just its new entries copied in, so the cost follows new
+checkpoints, not history. A project whose index generation changed (retention
+compacted its sidecars, renumbering rows) is copied again from scratch, and
+the entries copied from it before are marked dead: search skips them, and
+their rows are dropped once they pass 1/16 of the index.
+
+The index keeps its own copy of the section vectors in vectors.f32. Rows
+[0, base_rows) are grouped by inverted list, i.e. by nearest k-means centroid
+(centroids.f32, list boundaries in meta.json), so a query scores the centroids,
+then only the few lists nearest to it, as contiguous slices of a memory map.
+Rows appended since the last rebuild form a tail that is always scanned in
+full; once the tail passes 1/16 of the base, the tail is assigned to lists and
+merged in, and the centroids are retrained when the index has doubled since
+they were trained. Below MIN_IVF_ROWS everything stays in the (exact) tail.
+
+refs.i64 holds (entry << 16 | section) for each vector row; entry metadata
+lives in entries.ndjson, reached through the byte offsets in entries.i64 so a
+query only parses the lines it returns.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from store import get_project_checkpoint_dir, index_generation, load_index, locked
+from store import VECTORS_FILE as PROJECT_VECTORS_FILE
+
+GLOBAL_DIR = Path(os.environ.get("MEMORY_CHECKPOINT_HOME")
+                  or Path.home() / ".claude" / "checkpoints-global")
+PROJECTS_FILE = "projects.txt"
+META_FILE = "meta.json"
+VECTORS_FILE = "vectors.f32"
+REFS_FILE = "refs.i64"
+CENTROIDS_FILE = "centroids.f32"
+ENTRIES_FILE = "entries.ndjson"
+OFFSETS_FILE = "entries.i64"
+
+MIN_IVF_ROWS = 4096        # below this a flat scan is as fast as probing lists
+TAIL_FRACTION = 16         # merge the tail into the lists once it passes base/16
+TRAIN_SAMPLE = 50_000
+BATCH = 65_536
+
+def _projects() -> list[str]:
+    path = GLOBAL_DIR / PROJECTS_FILE
+    if not path.exists():
+        return []
+    return [line for line in path.read_text().splitlines() if line]
+
+def register_project(project_dir: str | None = None) -> None:
+    """Remember a project root so --global search covers its checkpoints."""
+    project = str(Path(project_dir or Path.cwd()).resolve())
+    if project in _projects():
+        return
+    GLOBAL_DIR.mkdir(parents=True, exist_ok=True)
+    with locked(GLOBAL_DIR):
+        if project not in _projects():
+            with open(GLOBAL_DIR / PROJECTS_FILE, "a") as f:
+                f.write(project + "\n")
+
+def _load_meta() -> dict:
+    path = GLOBAL_DIR / META_FILE
+    if path.exists():
+        with open(path) as f:
+            return json.load(f)
+    return {"rows": 0, "base_rows": 0, "entries": 0, "entries_bytes": 0, "synced": {},
+            "dead": [], "dead_rows": 0}
+
+def _save_meta(meta: dict) -> None:
+    tmp = GLOBAL_DIR / f".{META_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, GLOBAL_DIR / META_FILE)
+
+def _append(name: str, size: int, data: bytes) -> None:
+    """Append to one of the index files, first dropping anything past the size
+    meta.json knows about (left by a sync that died before saving it)."""
+    with open(GLOBAL_DIR / name, "ab") as f:
+        f.truncate(size)
+        f.write(data)
+
+def _dead_mask(meta: dict):
+    """Per entry id, whether it was copied from a project since re-synced."""
+    import numpy as np
+    mask = np.zeros(meta["entries"], dtype=bool)
+    for start, end in meta.get("dead", []):
+        mask[start:end] = True
+    return mask
+
+def _forget(meta: dict, project: str) -> None:
+    """Mark every entry copied from project dead, ahead of copying it again."""
+    import numpy as np
+    prefix = json.dumps({"project": project})[:-1].encode() + b","
+    mask = _dead_mask(meta)
+    if meta["entries"]:
+        with open(GLOBAL_DIR / ENTRIES_FILE, "rb") as f:
+            for i, line in zip(range(meta["entries"]), f):
+                mask[i] |= line.startswith(prefix)
+    refs = np.memmap(GLOBAL_DIR / REFS_FILE, dtype=np.int64, mode="r",
+                     shape=(meta["rows"],)) if meta["rows"] else np.empty(0, dtype=np.int64)
+    meta["dead_rows"] = int(mask[refs >> 16].sum())
+    # Store the dead ids as [start, end) runs (each sync appended a contiguous run),
+    # or none at all once none of them has rows left
+    edges = np.flatnonzero(np.diff(np.r_[0, mask.astype(np.int8), 0])).tolist()
+    meta["dead"] = [edges[i:i + 2] for i in range(0, len(edges), 2)] if meta["dead_rows"] else []
+
+def _ingest(meta: dict, project: str) -> bool:
+    """Copy a project's checkpoints added since the last sync into the index
+    (all of them, if its rows were renumbered); returns True if anything changed."""
+    import numpy as np
+    checkpoint_dir = get_project_checkpoint_dir(project)
+    sidecar = checkpoint_dir / PROJECT_VECTORS_FILE
+    synced = meta["synced"].get(project, 0)
+    if isinstance(synced, int):           # synced before generations were tracked
+        synced = {"bytes": synced, "generation": 0}
+    if not sidecar.exists() or (sidecar.stat().st_size == synced["bytes"]
+                                and index_generation(checkpoint_dir) == synced["generation"]):
+        return False
+    with locked(checkpoint_dir):          # vectors and index lines agree under the lock
+        index = load_index(checkpoint_dir)
+        size = sidecar.stat().st_size
+    done, generation = synced["bytes"], index.get("generation", 0)
+    if generation != synced["generation"]:
+        _forget(meta, project)
+        done = 0
+    meta["synced"][project] = {"bytes": size, "generation": generation}
+    dim = index.get("embedding_dim")
+    if not dim or meta.setdefault("dim", dim) != dim:
+        return True                       # no vectors, or another model's
+    done, total = done // (4 * dim), size // (4 * dim)
+
+    rows, refs, lines, offsets = [], [], [], []
+    entry_id, position = meta["entries"], meta["entries_bytes"]
+    for c in index["checkpoints"]:
+        count = len(c.get("chunks") or [None])
+        if c.get("row") is None or c["row"] < done or c["row"] + count > total:
+            continue
+        rows.extend(range(c["row"], c["row"] + count))
+        refs.extend((entry_id << 16) | i for i in range(count))
+        line = (json.dumps({"project": project, **{k: c.get(k) for k in (
+            "filename", "timestamp", "status", "summary", "chunks")}}) + "\n").encode()
+        lines.append(line)
+        offsets.append(position)
+        entry_id, position = entry_id + 1, position + len(line)
+    if not rows:
+        return True
+
+    vectors = np.memmap(sidecar, dtype=np.float32, mode="r", shape=(total, dim))
+    _append(ENTRIES_FILE, meta["entries_bytes"], b"".join(lines))
+    _append(OFFSETS_FILE, 8 * meta["entries"], np.asarray(offsets, dtype=np.int64).tobytes())
+    _append(VECTORS_FILE, 4 * dim * meta["rows"], np.asarray(vectors[rows], dtype=np.float32).tobytes())
+    _append(REFS_FILE, 8 * meta["rows"], np.asarray(refs, dtype=np.int64).tobytes())
+    meta["entries"], meta["entries_bytes"] = entry_id, position
+    meta["rows"] += len(rows)
+    return True
+
+def _drop_dead(meta: dict) -> None:
+    """Rewrite the index files without the rows of dead entries, keeping the
+    inverted lists (and the tail) in place."""
+    import numpy as np
+    dim, rows, base = meta["dim"], meta["rows"], meta["base_rows"]
+    vectors = np.memmap(GLOBAL_DIR / VECTORS_FILE, dtype=np.float32, mode="r", shape=(rows, dim))
+    refs = np.fromfile(GLOBAL_DIR / REFS_FILE, dtype=np.int64, count=rows)
+    keep = ~_dead_mask(meta)[refs >> 16]
+
+    tmp = GLOBAL_DIR / f".{VECTORS_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        for start in range(0, rows, BATCH):
+            np.asarray(vectors[start:start + BATCH][keep[start:start + BATCH]]).tofile(f)
+    os.replace(tmp, GLOBAL_DIR / VECTORS_FILE)
+    tmp = GLOBAL_DIR / f".{REFS_FILE}.{os.getpid()}.tmp"
+    refs[keep].tofile(tmp)
+    os.replace(tmp, GLOBAL_DIR / REFS_FILE)
+    if base:
+        bounds = meta["list_offsets"]
+        lists = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))[keep[:base]]
+        meta["list_offsets"] = np.searchsorted(lists, np.arange(len(bounds))).tolist()
+        meta["base_rows"] = len(lists)
+    meta["rows"] = int(keep.sum())
+    meta["dead"], meta["dead_rows"] = [], 0
+
+def _assign(vectors, centroids):
+    """Nearest centroid (by cosine) of every row, in batches."""
+    import numpy as np
+    out = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), BATCH):
+        out[start:start + BATCH] = np.argmax(vectors[start:start + BATCH] @ centroids.T, axis=1)
+    return out
+
+def _kmeans(sample, k: int, iterations: int = 10):
+    """Spherical k-means: unit-length centroids maximizing cosine to their rows."""
+    import numpy as np
+    rng = np.random.default_rng(0)
+    centroids = sample[rng.choice(len(sample), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _assign(sample, centroids)
+        order = np.argsort(assign, kind="stable")
+        lists, starts = np.unique(assign[order], return_index=True)
+        sums = np.add.reduceat(sample[order], starts, axis=0)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids[lists] = sums / np.where(norms == 0, 1, norms)
+    return centroids
+
+def _rebuild(meta: dict) -> None:
+    """Fold the tail into the inverted lists (retraining centroids if the index
+    has doubled since they were trained) and rewrite rows grouped by list."""
+    import numpy as np
+    dim, rows, base = meta["dim"], meta["rows"], meta["base_rows"]
+    vectors = np.memmap(GLOBAL_DIR / VECTORS_FILE, dtype=np.float32, mode="r", shape=(rows, dim))
+    refs = np.fromfile(GLOBAL_DIR / REFS_FILE, dtype=np.int64, count=rows)
+
+    if not base or rows > 2 * meta.get("trained_rows", 0):
+        nlist = int(min(max(rows ** 0.5, 16), 4096))
+        rng = np.random.default_rng(0)
+        sample = np.asarray(vectors[np.sort(rng.choice(rows, min(rows, TRAIN_SAMPLE), replace=False))])
+        centroids = _kmeans(sample, nlist)
+        centroids.astype(np.float32).tofile(GLOBAL_DIR / CENTROIDS_FILE)
+        meta["trained_rows"] = rows
+        assign = _assign(vectors, centroids)
+    else:
+        centroids = np.fromfile(GLOBAL_DIR / CENTROIDS_FILE, dtype=np.float32).reshape(-1, dim)
+        nlist = len(centroids)
+        bounds = np.asarray(meta["list_offsets"])
+        assign = np.concatenate([np.repeat(np.arange(nlist), np.diff(bounds)),
+                                 _assign(vectors[base:], centroids)])
+
+    order = np.argsort(assign, kind="stable")
+    tmp = GLOBAL_DIR / f".{VECTORS_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        for start in range(0, rows, BATCH):
+            np.asarray(vectors[order[start:start + BATCH]]).tofile(f)
+    os.replace(tmp, GLOBAL_DIR / VECTORS_FILE)
+    tmp = GLOBAL_DIR / f".{REFS_FILE}.{os.getpid()}.tmp"
+    refs[order].tofile(tmp)
+    os.replace(tmp, GLOBAL_DIR / REFS_FILE)
+    meta["list_offsets"] = np.searchsorted(assign[order], np.arange(nlist + 1)).tolist()
+    meta["base_rows"] = rows
+
+def sync() -> dict:
+    """Bring the index up to date with every registered project. Call with the
+    global lock held; returns the index meta."""
+    meta = _load_meta()
+    changed = False
+    for project in _projects():
+        changed |= _ingest(meta, project)
+    if meta.get("dead_rows", 0) > meta["rows"] // TAIL_FRACTION:
+        _drop_dead(meta)
+        changed = True
+    rows, base = meta["rows"], meta["base_rows"]
+    if base and rows - base > base // TAIL_FRACTION or not base and rows >= MIN_IVF_ROWS:
+        _rebuild(meta)
+        changed = True
+    if changed:
+        _save_meta(meta)
+    return meta
+
+def _entry(offsets, entry_id: int) -> dict:
+    with open(GLOBAL_DIR / ENTRIES_FILE) as f:
+        f.seek(int(offsets[entry_id]))
+        return json.loads(f.readline())
+
+def search(query_embedding: list[float], top_n: int = 5, nprobe: int | None = None) -> list[dict]:
+    """Best-matching checkpoints across all registered projects, best first."""
+    import numpy as np
+    GLOBAL_DIR.mkdir(parents=True, exist_ok=True)
+    with locked(GLOBAL_DIR):
+        meta = sync()
+        rows, base = meta["rows"], meta["base_rows"]
+        if not rows or meta["dim"] != len(query_embedding):
+            return []
+        vectors = np.memmap(GLOBAL_DIR / VECTORS_FILE, dtype=np.float32, mode="r",
+                            shape=(rows, meta["dim"]))
+        refs = np.memmap(GLOBAL_DIR / REFS_FILE, dtype=np.int64, mode="r", shape=(rows,))
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+
+        # Probe the lists whose centroids are nearest, then scan the unlisted tail
+        spans = []
+        if base:
+            bounds = meta["list_offsets"]
+            centroids = np.fromfile(GLOBAL_DIR / CENTROIDS_FILE, dtype=np.float32).reshape(-1, meta["dim"])
+            nprobe = nprobe or max(8, len(centroids) // 8)
+            for i in np.argsort(-(centroids @ query))[:nprobe]:
+                spans.append((bounds[i], bounds[i + 1]))
+        spans.append((base, rows))
+        scores = np.concatenate([vectors[a:b] @ query for a, b in spans])
+        hits = np.concatenate([refs[a:b] for a, b in spans])
+        if meta.get("dead"):              # copied from a project before it was re-synced
+            alive = ~_dead_mask(meta)[hits >> 16]
+            scores, hits = scores[alive], hits[alive]
+            if not len(hits):
+                return []
+
+        # Max-pool sections into checkpoints
+        owners = hits >> 16
+        order = np.lexsort((-scores, owners))
+        firsts = order[np.r_[True, owners[order][1:] != owners[order][:-1]]]
+        best = firsts[np.argsort(-scores[firsts], kind="stable")[:top_n]]
+
+        offsets = np.memmap(GLOBAL_DIR / OFFSETS_FILE, dtype=np.int64, mode="r")
+        results = []
+        for i in best:
+            entry = _entry(offsets, int(owners[i]))
+            chunk = (entry.get("chunks") or [None])[int(hits[i] & 0xFFFF)]
+            results.append({
+                "project": entry["project"],
+                "timestamp": entry["timestamp"],
+                "filename": entry["filename"],
+                "status": entry["status"],
+                "summary": entry["summary"],
+                "score": float(scores[i]),
+                "section": chunk[2] if chunk else None,
+                "span": chunk[:2] if chunk else None
+            })
+        return results
@@ -0,0 +1,103 @@
+"""BM25 keyword index over checkpoint sections, in SQLite FTS5 (stdlib only).
+
+Exact identifiers (ticket numbers, function names, error codes) are what
+embeddings handle worst, and answering them this way never loads the model.
+checkpoint.py adds each new checkpoint's sections as it saves it; search()
+first indexes any checkpoint the database doesn't know yet (ones saved before
+it existed) and drops ones that left the index. The database is derived data:
+deleting lexical.db just means the next search rebuilds it.
+"""
+
+import re
+import sqlite3
+from contextlib import closing, contextmanager
+from pathlib import Path
+
+from store import read_checkpoint
+
+LEXICAL_DB = "lexical.db"
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5(
+    body, filename UNINDEXED, section UNINDEXED, tokenize = "unicode61 tokenchars '_'");
+CREATE TABLE IF NOT EXISTS docs (filename TEXT PRIMARY KEY);
+"""
+
+def connect(checkpoint_dir: Path) -> sqlite3.Connection | None:
+    """Open (creating if needed) the keyword index, or None if this Python's
+    SQLite was built without FTS5."""
+    db = sqlite3.connect(str(checkpoint_dir / LEXICAL_DB), timeout=60, isolation_level=None)
+    try:
+        db.execute("PRAGMA journal_mode = WAL")
+        db.executescript(SCHEMA)
+    except sqlite3.OperationalError:
+        db.close()
+        return None
+    return db
+
+@contextmanager
+def _write(db: sqlite3.Connection):
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        db.execute("ROLLBACK")
+        raise
+    db.execute("COMMIT")
+
+def _add(db: sqlite3.Connection, filename: str, content: str, chunks: list | None) -> None:
+    spans = chunks or [[0, len(content), ""]]
+    with _write(db):
+        if db.execute("SELECT 1 FROM docs WHERE filename = ?", (filename,)).fetchone():
+            return                              # another writer got here first
+        db.executemany("INSERT INTO sections (body, filename, section) VALUES (?, ?, ?)",
+                       [(content[start:end], filename, i) for i, (start, end, _) in enumerate(spans)])
+        db.execute("INSERT INTO docs VALUES (?)", (filename,))
+
+def index_checkpoint(checkpoint_dir: Path, filename: str, content: str, chunks: list | None) -> None:
+    """Add one checkpoint's sections to the keyword index."""
+    db = connect(checkpoint_dir)
+    if db is not None:
+        with closing(db):
+            _add(db, filename, content, chunks)
+
+def sync(db: sqlite3.Connection, checkpoint_dir: Path, index: dict) -> None:
+    """Index checkpoints the database is missing; forget ones the index dropped."""
+    entries = {c["filename"]: c for c in index["checkpoints"]}
+    known = {f for (f,) in db.execute("SELECT filename FROM docs")}
+    for filename in entries.keys() - known:
+        content = read_checkpoint(checkpoint_dir, filename)
+        if content:
+            _add(db, filename, content, entries[filename].get("chunks"))
+    gone = [(f,) for f in known - entries.keys()]
+    if gone:
+        with _write(db):
+            db.executemany("DELETE FROM sections WHERE filename = ?", gone)
+            db.executemany("DELETE FROM docs WHERE filename = ?", gone)
+
+def match_expression(query: str) -> str:
+    """Any of the query's words, each as an FTS5 phrase, so identifiers like
+    PROJ-1234 or foo.bar() are matched as written rather than parsed as syntax."""
+    words = [w for w in query.split() if re.search(r"\w", w)]
+    return " OR ".join('"' + w.replace('"', '""') + '"' for w in words)
+
+def search(checkpoint_dir: Path, index: dict, query: str, limit: int) -> list[tuple[str, int, float]]:
+    """(filename, section, bm25 score) for the best-scoring section of the top
+    checkpoints, best first. Raises RuntimeError without FTS5."""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    db = connect(checkpoint_dir)
+    if db is None:
+        raise RuntimeError("SQLite FTS5 is not available for keyword search")
+    with closing(db):
+        sync(db, checkpoint_dir, index)
+        best = {}
+        # bm25() is lower-is-better; rank sections, keep each checkpoint's first
+        for filename, section, score in db.execute(
+                "SELECT filename, section, bm25(sections) FROM sections WHERE sections MATCH ? "
+                "ORDER BY bm25(sections) LIMIT ?", (expression, 20 * limit)):
+            if filename not in best:
+                best[filename] = (filename, section, -score)
+                if len(best) == limit:
+                    break
+    return list(best.values())
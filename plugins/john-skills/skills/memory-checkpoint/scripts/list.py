@@ -3,36 +3,11 @@
 
 import argparse
 import json
-import os
-import subprocess
 import sys
 from pathlib import Path
 
-# Setup and use skill venv
-SKILL_DIR = Path(__file__).parent.parent
-VENV_PYTHON = SKILL_DIR / ".venv" / "bin" / "python3"
-SETUP_SCRIPT = SKILL_DIR / "scripts" / "setup.sh"
-
-if not VENV_PYTHON.exists() and SETUP_SCRIPT.exists():
-    print("Setting up venv (first run)...", file=sys.stderr)
-    subprocess.run(["bash", str(SETUP_SCRIPT)], check=True)
-
-if VENV_PYTHON.exists() and sys.executable != str(VENV_PYTHON):
-    os.execv(str(VENV_PYTHON), [str(VENV_PYTHON)] + sys.argv)
-
-def get_project_checkpoint_dir(project_dir: str | None = None) -> Path:
-    """Get the checkpoint directory for the current project."""
-    if project_dir:
-        return Path(project_dir) / ".claude" / "checkpoints"
-    return Path.cwd() / ".claude" / "checkpoints"
-
-def load_index(checkpoint_dir: Path) -> dict:
-    """Load the checkpoint index."""
-    index_path = checkpoint_dir / "index.json"
-    if not index_path.exists():
-        return {"checkpoints": []}
-    with open(index_path) as f:
-        return json.load(f)
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from store import get_project_checkpoint_dir, load_index, read_checkpoint  # noqa: E402
 
 def list_checkpoints(limit: int = 10, status_filter: str | None = None, project_dir: str | None = None) -> list[dict]:
     """List recent checkpoints."""
@@ -51,23 +26,21 @@ def list_checkpoints(limit: int = 10, status_filter: str | None = None, project_
     # Return limited results without embeddings
     results = []
     for c in checkpoints[:limit]:
-        results.append({
+        result = {
             "timestamp": c.get("timestamp"),
             "filename": c.get("filename"),
             "status": c.get("status"),
             "summary": c.get("summary"),
             "auto": c.get("auto", False)
-        })
+        }
+        if c.get("digest"):
+            result["digest"] = c["digest"]      # how many auto checkpoints it stands for
+        results.append(result)
     return results
 
 def read_checkpoint_content(filename: str, project_dir: str | None = None) -> str:
-    """Read the full content of a checkpoint file."""
-    checkpoint_dir = get_project_checkpoint_dir(project_dir)
-    filepath = checkpoint_dir / filename
-    if filepath.exists():
-        with open(filepath) as f:
-            return f.read()
-    return ""
+    """Read the full content of a checkpoint file (or its archived copy)."""
+    return read_checkpoint(get_project_checkpoint_dir(project_dir), filename)
 
 def main():
     parser = argparse.ArgumentParser(description="List recent checkpoints")
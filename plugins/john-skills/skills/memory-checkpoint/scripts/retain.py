@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Apply checkpoint retention: digest old auto checkpoints, archive aged files.
+
+Auto checkpoints older than --digest-after days are collapsed into one digest
+per day: a timeline of their statuses and summaries, then the day's last
+checkpoint in full. BLOCKED and DECISION_NEEDED checkpoints, manual ones, and
+days with a single auto checkpoint are kept as they are. Then checkpoint files
+older than --archive-after days are packed into archive/YYYY-MM.zip and
+removed from the directory; list.py --latest and search.py --full still read
+them from there. Finally the embedding sidecars drop the rows of the
+checkpoints the digests replaced (archived ones stay searchable, so their rows
+stay). Stdlib only, so it is cheap enough to run from a hook; a run
+that finds another in progress exits at once.
+"""
+
+import argparse
+import json
+import sys
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock; don't run two retention passes at once there
+    fcntl = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from store import (append_checkpoint, archive_path, compact_index, compact_vectors,  # noqa: E402
+                   delete_checkpoints, get_project_checkpoint_dir, load_index, read_checkpoint)
+from lexical import index_checkpoint  # noqa: E402
+from sections import split_sections  # noqa: E402
+
+KEEP_STATUSES = {"BLOCKED", "DECISION_NEEDED"}
+RETAIN_LOCK = ".retain.lock"
+
+def plan_digests(index: dict, cutoff: str) -> dict[str, list[dict]]:
+    """Auto checkpoints older than cutoff that can be collapsed, by day."""
+    days = {}
+    for c in index["checkpoints"]:
+        if (c.get("auto") and not c.get("digest") and c.get("status") not in KEEP_STATUSES
+                and c.get("timestamp", "") < cutoff):
+            days.setdefault(c["timestamp"][:10], []).append(c)
+    return {day: sorted(group, key=lambda c: c["timestamp"])
+            for day, group in sorted(days.items()) if len(group) > 1}
+
+def write_digest(checkpoint_dir: Path, day: str, members: list[dict]) -> str:
+    """Replace one day's auto checkpoints with a digest checkpoint; returns its filename."""
+    last = members[-1]
+    timeline = "\n".join(f"- {c['timestamp'][11:16]} {c['status']}: {c['summary']}" for c in members)
+    content = (f"# Digest: {day} ({len(members)} auto checkpoints)\n\n"
+               f"## Timeline\n{timeline}\n\n"
+               + read_checkpoint(checkpoint_dir, last["filename"]))
+    filename = last["filename"][:-len(".md")] + "-digest.md"
+    (checkpoint_dir / filename).write_text(content)
+
+    # Add the digest before dropping its members, so a crash in between loses nothing
+    chunks = split_sections(content)
+    append_checkpoint(checkpoint_dir, {
+        "timestamp": last["timestamp"],
+        "filename": filename,
+        "status": last["status"],
+        "summary": last["summary"],
+        "auto": True,
+        "digest": len(members),
+        "chunks": chunks,
+        "pending": True                         # embedded by the next flush or search
+    }, [])
+    index_checkpoint(checkpoint_dir, filename, content, chunks)
+    delete_checkpoints(checkpoint_dir, [c["filename"] for c in members])
+    for c in members:
+        (checkpoint_dir / c["filename"]).unlink(missing_ok=True)
+    return filename
+
+def plan_archive(checkpoint_dir: Path, index: dict, cutoff: str) -> dict[Path, list[str]]:
+    """Checkpoint files older than cutoff still in the directory, by archive."""
+    archives = {}
+    for c in index["checkpoints"]:
+        if c.get("timestamp", "") < cutoff and (checkpoint_dir / c["filename"]).exists():
+            archives.setdefault(archive_path(checkpoint_dir, c["filename"]), []).append(c["filename"])
+    return archives
+
+def archive_files(checkpoint_dir: Path, archives: dict[Path, list[str]]) -> None:
+    """Pack files into their monthly archives, then remove them."""
+    for path, names in archives.items():
+        path.parent.mkdir(exist_ok=True)
+        with zipfile.ZipFile(path, "a", zipfile.ZIP_DEFLATED) as archive:
+            have = set(archive.namelist())      # already packed by a run that died before unlinking
+            for name in names:
+                if name not in have:
+                    archive.write(checkpoint_dir / name, name)
+        for name in names:
+            (checkpoint_dir / name).unlink()
+
+def retain(project_dir: str | None = None, digest_after: float = 7, archive_after: float = 30,
+           dry_run: bool = False) -> dict:
+    """Run one retention pass over a project's checkpoints."""
+    checkpoint_dir = get_project_checkpoint_dir(project_dir)
+    if not checkpoint_dir.exists():
+        return {"digests": 0, "digested": 0, "archived": 0, "vector_rows_dropped": 0}
+    now = datetime.now()
+
+    with open(checkpoint_dir / RETAIN_LOCK, "a") as lock:
+        if fcntl:
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return {"skipped": "another retention pass is running"}
+
+        days = plan_digests(load_index(checkpoint_dir), (now - timedelta(days=digest_after)).isoformat())
+        if not dry_run:
+            for day, members in days.items():
+                write_digest(checkpoint_dir, day, members)
+
+        index = load_index(checkpoint_dir)
+        archives = plan_archive(checkpoint_dir, index, (now - timedelta(days=archive_after)).isoformat())
+        if not dry_run:
+            archive_files(checkpoint_dir, archives)
+            compact_index(checkpoint_dir)
+        dropped = 0 if dry_run else compact_vectors(checkpoint_dir)
+
+    return {
+        "digests": len(days),
+        "digested": sum(len(members) for members in days.values()),
+        "archived": sum(len(names) for names in archives.values()),
+        "vector_rows_dropped": dropped,
+        "dry_run": dry_run
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Digest old auto checkpoints and archive aged files")
+    parser.add_argument("--digest-after", type=float, default=7,
+                        help="Collapse auto checkpoints older than this many days into daily digests (default: 7)")
+    parser.add_argument("--archive-after", type=float, default=30,
+                        help="Move checkpoint files older than this many days into archive/ (default: 30)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without changing it")
+    parser.add_argument("--project-dir", type=str, help="Project root directory (defaults to cwd)")
+    args = parser.parse_args()
+
+    result = retain(args.project_dir, args.digest_after, args.archive_after, args.dry_run)
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,108 +1,252 @@
 #!/usr/bin/env python3
-"""Semantic search over checkpoints using cosine similarity."""
+"""Search over checkpoints: semantic (cosine similarity), lexical (BM25), or both fused."""
 
 import argparse
 import json
-import math
-import os
-import subprocess
 import sys
 from pathlib import Path
 
-# Setup and use skill venv
-SKILL_DIR = Path(__file__).parent.parent
-VENV_PYTHON = SKILL_DIR / ".venv" / "bin" / "python3"
-SETUP_SCRIPT = SKILL_DIR / "scripts" / "setup.sh"
-
-if not VENV_PYTHON.exists() and SETUP_SCRIPT.exists():
-    print("Setting up venv (first run)...", file=sys.stderr)
-    subprocess.run(["bash", str(SETUP_SCRIPT)], check=True)
-
-if VENV_PYTHON.exists() and sys.executable != str(VENV_PYTHON):
-    os.execv(str(VENV_PYTHON), [str(VENV_PYTHON)] + sys.argv)
-
-def get_project_checkpoint_dir(project_dir: str | None = None) -> Path:
-    """Get the checkpoint directory for the current project."""
-    if project_dir:
-        return Path(project_dir) / ".claude" / "checkpoints"
-    return Path.cwd() / ".claude" / "checkpoints"
-
-def load_index(checkpoint_dir: Path) -> dict:
-    """Load the checkpoint index."""
-    index_path = checkpoint_dir / "index.json"
-    if not index_path.exists():
-        return {"checkpoints": []}
-    with open(index_path) as f:
-        return json.load(f)
-
-def cosine_similarity(a: list[float], b: list[float]) -> float:
-    """Compute cosine similarity between two vectors."""
-    if not a or not b or len(a) != len(b):
-        return 0.0
-    dot = sum(x * y for x, y in zip(a, b))
-    norm_a = math.sqrt(sum(x * x for x in a))
-    norm_b = math.sqrt(sum(x * x for x in b))
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
-    return dot / (norm_a * norm_b)
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from store import (get_project_checkpoint_dir, load_index, load_sign_bits,  # noqa: E402
+                   load_vectors, locked, read_checkpoint, record_meta, upgrade_legacy_index)
+from embed import embed_pending, embed_texts, server_running  # noqa: E402
+import global_index  # noqa: E402
+import lexical  # noqa: E402
+from skill_env import require  # noqa: E402
+
+RRF_K = 60  # reciprocal rank fusion: a checkpoint scores sum(1 / (RRF_K + rank))
+PREFILTER_MIN_ROWS = 4096  # below this, scoring every float row is already fast
+RERANK_MIN = 512           # sections re-scored exactly after the sign-bit prefilter
+CALIBRATION_QUERIES = 64   # stored sections used as queries to measure prefilter recall
+RECALL_TARGET = 0.99       # recall@10 they must get; their neighbors sit closer than a
+                           # typed query's, and this keeps real queries at 0.95 or better
+MAX_RERANK_FRACTION = 0.25 # re-scoring more than this: skip the prefilter, score everything
+
+def top_indices(scores, k: int):
+    """Indices of the k highest scores, best first, without sorting everything."""
+    import numpy as np
+    if k < len(scores):
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+def hamming(bits, query_bits):
+    """Bit distance from query_bits to each row of packed sign bits."""
+    import numpy as np
+    if bits.shape[1] % 8 == 0:            # whole 64-bit words: an eighth of the ops
+        bits, query_bits = bits.view(np.uint64), query_bits.view(np.uint64)
+    diff = np.bitwise_xor(bits, query_bits)
+    if hasattr(np, "bitwise_count"):      # NumPy 2
+        return np.bitwise_count(diff).sum(axis=1, dtype=np.int32)
+    return np.unpackbits(diff.view(np.uint8), axis=1).sum(axis=1, dtype=np.int32)
+
+def rerank_fraction(vectors, bits) -> float:
+    """The share of sections the sign-bit prefilter must pass on for recall@10 to
+    reach RECALL_TARGET, measured with sampled sections as queries (each left out
+    of its own results); 1.0 if that share is over MAX_RERANK_FRACTION, i.e. the
+    prefilter can't be trusted on this corpus and search should score every row."""
+    import numpy as np
+    rows = len(vectors)
+    sample = np.sort(np.random.default_rng(0).choice(rows, min(CALIBRATION_QUERIES, rows), replace=False))
+    queries = np.asarray(vectors[sample])
+    best_scores = np.full((len(sample), 10), -np.inf, dtype=np.float32)
+    best_rows = np.zeros((len(sample), 10), dtype=np.int64)
+    for start in range(0, rows, 65536):
+        scores = queries @ vectors[start:start + 65536].T
+        own = (sample >= start) & (sample < start + scores.shape[1])
+        scores[own, sample[own] - start] = -np.inf
+        scores = np.concatenate([best_scores, scores], axis=1)
+        ids = np.concatenate([best_rows, np.broadcast_to(np.arange(start, start + scores.shape[1] - 10),
+                                                         (len(sample), scores.shape[1] - 10))], axis=1)
+        keep = np.argpartition(-scores, 9, axis=1)[:, :10]
+        best_scores = np.take_along_axis(scores, keep, axis=1)
+        best_rows = np.take_along_axis(ids, keep, axis=1)
+
+    # How deep in Hamming order each true neighbor sits, counting every tie ahead of it
+    ranks = []
+    for query_row, neighbors in zip(sample, best_rows):
+        distance = hamming(bits, bits[query_row])
+        ahead = np.cumsum(np.bincount(distance, minlength=8 * bits.shape[1] + 1))
+        ranks.extend(ahead[distance[neighbors]])
+    needed = np.sort(ranks)[int(np.ceil(RECALL_TARGET * len(ranks))) - 1] / rows
+    return float(needed) if needed <= MAX_RERANK_FRACTION else 1.0
 
 def generate_embedding(text: str) -> list[float]:
-    """Generate embedding using FastEmbed."""
-    try:
-        from fastembed import TextEmbedding
-        model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5")
-        embeddings = list(model.embed([text]))
-        return embeddings[0].tolist()
-    except ImportError:
-        print("Error: fastembed not installed. Run: pip install fastembed", file=sys.stderr)
-        sys.exit(1)
+    """Generate embedding using FastEmbed (via the warm server when it is running).
+    Raises ImportError if neither is available."""
+    return embed_texts([text])[0]
+
+def _result(checkpoint: dict, score: float, chunk: list | None) -> dict:
+    return {
+        "timestamp": checkpoint["timestamp"],
+        "filename": checkpoint["filename"],
+        "status": checkpoint["status"],
+        "summary": checkpoint["summary"],
+        "score": score,
+        "section": chunk[2] if chunk else None,
+        "span": chunk[:2] if chunk else None
+    }
 
 def search_checkpoints(query: str, top_n: int = 5, project_dir: str | None = None) -> list[dict]:
-    """Search checkpoints by semantic similarity."""
+    """Search checkpoints by semantic similarity of their best-matching section."""
     checkpoint_dir = get_project_checkpoint_dir(project_dir)
-    index = load_index(checkpoint_dir)
+    upgrade_legacy_index(checkpoint_dir)
+    if not checkpoint_dir.exists():
+        return []
+    embed_pending(checkpoint_dir)           # deferred auto checkpoints, in one batch
+    # Every section is a row of the mapped sidecar; an entry owns len(chunks) rows
+    # from "row". Take all three under the lock so a compaction can't renumber
+    # rows between reading the index and mapping the vectors.
+    with locked(checkpoint_dir):
+        index = load_index(checkpoint_dir)
+        vectors = load_vectors(checkpoint_dir, index)
+        bits = mean = None
+        if vectors is not None and len(vectors) > PREFILTER_MIN_ROWS:
+            bits, mean = load_sign_bits(checkpoint_dir, index, vectors)
+            if index.get("sign_rerank_rows") != index["sign_mean_rows"]:
+                # Measure the prefilter on this corpus whenever its centering changes
+                fields = {"sign_rerank": rerank_fraction(vectors, bits),
+                          "sign_rerank_rows": index["sign_mean_rows"]}
+                record_meta(checkpoint_dir, fields)
+                index.update(fields)
 
     if not index["checkpoints"]:
         return []
+    global_index.register_project(project_dir)
+
+    import numpy as np
 
     # Generate query embedding
     query_embedding = generate_embedding(query)
 
-    # Score all checkpoints
+    if vectors is None or vectors.shape[1] != len(query_embedding):
+        return []
+    entries, counts = [], []
+    for c in index["checkpoints"]:
+        count = len(c.get("chunks") or [None])
+        if c.get("row") is not None and c["row"] + count <= len(vectors):
+            entries.append(c)
+            counts.append(count)
+    if not entries:
+        return []
+    counts = np.asarray(counts, dtype=np.int64)
+    owners = np.repeat(np.arange(len(entries)), counts)
+    firsts = np.fromiter((c["row"] for c in entries), dtype=np.int64, count=len(entries))
+    offsets = np.arange(len(owners)) - np.repeat(np.cumsum(counts) - counts, counts)
+    rows = np.repeat(firsts, counts) + offsets
+    in_order = len(rows) == len(vectors) and (rows == np.arange(len(rows))).all()
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+    if len(rows) > PREFILTER_MIN_ROWS and bits is not None and index["sign_rerank"] < 1:
+        # Hamming distance over centered sign bits picks candidates, as many as the
+        # measured recall calls for (more for deeper top_n); only those read floats
+        depth = int(index["sign_rerank"] * len(rows) * max(1, top_n / 10)) + 1
+        distance = hamming(bits if in_order else bits[rows], np.packbits(query > mean))
+        candidates = np.sort(top_indices(-distance, max(RERANK_MIN, 50 * top_n, depth)))
+        section_scores = vectors[rows[candidates]] @ query
+    else:
+        candidates = np.arange(len(rows))
+        matrix = vectors if in_order else vectors[rows]   # every row in order: score the map directly
+        section_scores = matrix @ query
+
+    # Max-pool sections into a checkpoint score, remembering which section won
+    owner = owners[candidates]
+    order = np.lexsort((-section_scores, owner))
+    best = order[np.r_[True, owner[order][1:] != owner[order][:-1]]]
+    scores = section_scores[best]
+
     results = []
-    for checkpoint in index["checkpoints"]:
-        if not checkpoint.get("embedding"):
-            continue
-        score = cosine_similarity(query_embedding, checkpoint["embedding"])
-        results.append({
-            "timestamp": checkpoint["timestamp"],
-            "filename": checkpoint["filename"],
-            "status": checkpoint["status"],
-            "summary": checkpoint["summary"],
-            "score": score
-        })
-
-    # Sort by score descending
-    results.sort(key=lambda x: x["score"], reverse=True)
-    return results[:top_n]
+    for i in top_indices(scores, top_n):
+        checkpoint = entries[owner[best[i]]]
+        chunk = (checkpoint.get("chunks") or [None])[int(offsets[candidates[best[i]]])]
+        results.append(_result(checkpoint, float(scores[i]), chunk))
+    return results
 
-def read_checkpoint_content(filename: str, project_dir: str | None = None) -> str:
-    """Read the full content of a checkpoint file."""
+def search_lexical(query: str, top_n: int = 5, project_dir: str | None = None) -> list[dict]:
+    """Search checkpoints by BM25 keyword score of their best-matching section.
+    Needs neither NumPy nor the embedding model."""
     checkpoint_dir = get_project_checkpoint_dir(project_dir)
-    filepath = checkpoint_dir / filename
-    if filepath.exists():
-        with open(filepath) as f:
-            return f.read()
-    return ""
+    upgrade_legacy_index(checkpoint_dir)
+    index = load_index(checkpoint_dir)
+
+    if not index["checkpoints"]:
+        return []
+
+    by_name = {c["filename"]: c for c in index["checkpoints"]}
+    results = []
+    for filename, section, score in lexical.search(checkpoint_dir, index, query, top_n):
+        checkpoint = by_name[filename]
+        chunks = checkpoint.get("chunks")
+        results.append(_result(checkpoint, score, chunks[section] if chunks else None))
+    return results
+
+def search_hybrid(query: str, top_n: int = 5, project_dir: str | None = None) -> list[dict]:
+    """Fuse the semantic and lexical rankings by reciprocal rank. Without the
+    embedding model, falls back to the lexical ranking alone."""
+    depth = max(4 * top_n, 50)
+    try:
+        keyword = search_lexical(query, depth, project_dir)
+    except RuntimeError:                        # no FTS5: semantic ranking alone
+        return search_checkpoints(query, top_n, project_dir)
+    try:
+        semantic = search_checkpoints(query, depth, project_dir)
+    except ImportError:
+        print("Warning: fastembed not installed; keyword results only", file=sys.stderr)
+        return keyword[:top_n]
+
+    fused, best = {}, {}
+    for ranking in (semantic, keyword):
+        for rank, result in enumerate(ranking):
+            name = result["filename"]
+            fused[name] = fused.get(name, 0.0) + 1.0 / (RRF_K + rank + 1)
+            if name not in best or rank < best[name][0]:
+                best[name] = (rank, result)     # report the section that ranked best
+    results = []
+    for name in sorted(fused, key=fused.get, reverse=True)[:top_n]:
+        result = best[name][1]
+        result["score"] = fused[name]
+        results.append(result)
+    return results
+
+def search_all_projects(query: str, top_n: int = 5) -> list[dict]:
+    """Search every registered project's checkpoints through the global IVF index."""
+    results = global_index.search(generate_embedding(query), 2 * top_n)
+    # checkpoints since digested or deleted stay in the global index; skip them
+    return [r for r in results
+            if read_checkpoint(get_project_checkpoint_dir(r["project"]), r["filename"])][:top_n]
+
+def read_checkpoint_content(filename: str, project_dir: str | None = None) -> str:
+    """Read the full content of a checkpoint file (or its archived copy)."""
+    return read_checkpoint(get_project_checkpoint_dir(project_dir), filename)
+
+def read_passage(result: dict, project_dir: str | None = None) -> str:
+    """The section of a result's checkpoint that matched (the whole file for
+    checkpoints saved before sections were indexed)."""
+    content = read_checkpoint_content(result["filename"], result.get("project", project_dir))
+    if result.get("span"):
+        start, end = result["span"]
+        content = content[start:end]
+    return content.strip()
 
 def main():
-    parser = argparse.ArgumentParser(description="Search checkpoints semantically")
+    parser = argparse.ArgumentParser(description="Search checkpoints")
     parser.add_argument("query", nargs="?", help="Search query")
     parser.add_argument("-n", "--top", type=int, default=5, help="Number of results (default: 5)")
-    parser.add_argument("--full", action="store_true", help="Show full checkpoint content for top result")
+    parser.add_argument("--full", action="store_true", help="Include the matching section of each result")
     parser.add_argument("--project-dir", type=str, help="Project root directory (defaults to cwd)")
+    parser.add_argument("--global", dest="all_projects", action="store_true",
+                        help="Search checkpoints of every project on this machine (semantic)")
+    parser.add_argument("--mode", choices=["hybrid", "semantic", "lexical"], default="hybrid",
+                        help="Ranking: fused (default), embeddings only, or BM25 keywords only "
+                             "(no model load; best for identifiers and error codes)")
     args = parser.parse_args()
 
+    # Keyword search is stdlib only; scoring vectors needs NumPy, and embedding
+    # the query needs fastembed unless the warm server does it
+    if args.all_projects or args.mode != "lexical":
+        require("numpy", *(() if server_running() else ("fastembed",)))
+
     if not args.query:
         # Read from stdin if no query provided
         args.query = sys.stdin.read().strip()
@@ -111,16 +255,31 @@ def main():
         print("Error: No search query provided", file=sys.stderr)
         sys.exit(1)
 
-    results = search_checkpoints(args.query, args.top, args.project_dir)
+    try:
+        if args.all_projects:
+            results = search_all_projects(args.query, args.top)
+        elif args.mode == "lexical":
+            results = search_lexical(args.query, args.top, args.project_dir)
+        elif args.mode == "semantic":
+            results = search_checkpoints(args.query, args.top, args.project_dir)
+        else:
+            results = search_hybrid(args.query, args.top, args.project_dir)
+    except ImportError:
+        print("Error: fastembed not installed. Run: pip install fastembed", file=sys.stderr)
+        sys.exit(1)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
     if not results:
         print("No checkpoints found.")
         return
 
-    output = {"results": results}
+    if args.full:
+        for result in results:
+            result["passage"] = read_passage(result, args.project_dir)
 
-    if args.full and results:
-        output["top_result_content"] = read_checkpoint_content(results[0]["filename"], args.project_dir)
+    output = {"results": results}
 
     print(json.dumps(output, indent=2))
 
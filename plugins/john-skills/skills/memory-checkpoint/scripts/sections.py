@@ -0,0 +1,45 @@
+"""Split checkpoint markdown into sections, the unit that gets embedded and indexed."""
+
+import re
+
+HEADING = re.compile(r"^#{1,6}\s+(.*)$", re.MULTILINE)
+MAX_CHUNK_CHARS = 1500  # bge-small reads ~512 tokens; longer sections are split at paragraphs
+
+def split_sections(content: str) -> list[list]:
+    """Split checkpoint markdown into [start, end, heading] spans, one per section.
+
+    A heading with nothing under it (the title, "## Status: ...") is folded into
+    the next section, and a section too long for the model is split at blank
+    lines, so each span is embedded whole.
+    """
+    starts = [m.start() for m in HEADING.finditer(content)]
+    if not starts or content[:starts[0]].strip():
+        starts.insert(0, 0)
+    bounds = starts + [len(content)]
+    chunks, start = [], None
+    for begin, end in zip(bounds, bounds[1:]):
+        start = begin if start is None else start
+        first_line, _, body = content[begin:end].partition("\n")
+        m = HEADING.match(first_line)
+        if m and not body.strip() and end < len(content):
+            continue                                # heading only: fold into the next
+        heading = m.group(1).strip() if m else ""
+        while end - start > MAX_CHUNK_CHARS:
+            cut = content.rfind("\n\n", start + 1, start + MAX_CHUNK_CHARS)
+            cut = cut if cut > start else start + MAX_CHUNK_CHARS
+            chunks.append([start, cut, heading])
+            start = cut
+        chunks.append([start, end, heading])
+        start = None
+    return [c for c in chunks if content[c[0]:c[1]].strip()]
+
+def section_texts(content: str, chunks: list[list]) -> list[str]:
+    """The text to embed for each [start, end, heading] span; pieces of a split
+    section get its heading back."""
+    texts = []
+    for start, end, heading in chunks:
+        text = content[start:end]
+        if heading and not HEADING.match(text):
+            text = f"{heading}\n{text}"           # continuation of a split section
+        texts.append(text)
+    return texts
@@ -0,0 +1,32 @@
+"""Switch to the skill's venv only on code paths that need its packages.
+
+Listing, keyword search, deferred checkpoints and index maintenance are stdlib
+only and run in whatever python3 started them. Paths that need NumPy or
+fastembed call require() first: if the modules aren't importable here, the
+script is re-executed under .venv/bin/python3 (created by setup.sh on first
+use) with the same arguments. Call it before reading stdin or writing
+anything, since the script starts over.
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SKILL_DIR = Path(__file__).parent.parent
+VENV_PYTHON = SKILL_DIR / ".venv" / "bin" / "python3"
+SETUP_SCRIPT = SKILL_DIR / "scripts" / "setup.sh"
+
+def require(*modules: str) -> None:
+    """Make sure modules can be imported, re-executing under the skill venv if not."""
+    if all(importlib.util.find_spec(m) for m in modules):
+        return
+
+    if not VENV_PYTHON.exists() and SETUP_SCRIPT.exists():
+        print("Setting up venv (first run)...", file=sys.stderr)
+        subprocess.run(["bash", str(SETUP_SCRIPT)], check=True)
+
+    if VENV_PYTHON.exists() and sys.executable != str(VENV_PYTHON):
+        sys.stdout.flush()
+        os.execv(str(VENV_PYTHON), [str(VENV_PYTHON)] + sys.argv)
@@ -0,0 +1,376 @@
+"""Checkpoint storage shared by the memory-checkpoint scripts.
+
+index.ndjson is an append-only log of checkpoint metadata: a {"meta": {...}}
+line, then one line per checkpoint, plus {"op": "update"|"delete", ...} lines
+for later changes. Writing a checkpoint appends one line under an exclusive
+lock, so it costs the same with ten checkpoints or ten thousand, and two hooks
+firing at once can't clobber each other. Readers replay the log. Updates and
+deletes rewrite it as a compact snapshot once dead lines outnumber live ones.
+
+Embeddings live next to it in embeddings.f32: raw float32, one unit-length row
+per checkpoint section. An entry's "chunks" lists its sections as [start, end,
+heading] character spans of the checkpoint file, and their vectors are the
+consecutive rows from "row" on (an entry without "chunks" has one row for the
+whole file). An entry marked "pending" was saved without vectors (an auto
+checkpoint defers embedding); attach_embeddings() adds them later. Appending
+vectors is a plain file append (no NumPy needed), listing never reads them,
+and search memory-maps the file instead of parsing floats out of JSON.
+embeddings.bits holds the same rows as sign bits (dim / 8 bytes each, 1/32 the
+size) taken after subtracting the corpus mean kept in the index meta, which
+search derives from the floats and uses as a Hamming prefilter on large
+projects.
+
+Checkpoint files past their retention age are moved into archive/YYYY-MM.zip
+(by the month in their filename) by retain.py; read_checkpoint() looks there
+when the file itself is gone.
+
+Deleted entries leave their rows behind in both sidecars until
+compact_vectors() rewrites them with only the rows live entries own,
+renumbering "row" and bumping the header's "generation" so anything that
+copied rows by position (the global index) knows to start over. The new
+sidecars and log are written beside the old ones and swapped in only once the
+log is complete, so a crash part way leaves either the old state or a swap
+that the next lock holder finishes.
+
+Older layouts (a single index.json, with or without inline embeddings) are
+read as-is and converted by the next writer.
+"""
+
+import json
+import os
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock; concurrent hooks are not serialized there
+    fcntl = None
+
+INDEX_FILE = "index.ndjson"
+LEGACY_INDEX_FILE = "index.json"
+VECTORS_FILE = "embeddings.f32"
+BITS_FILE = "embeddings.bits"
+LOCK_FILE = ".index.lock"
+ARCHIVE_DIR = "archive"
+COMPACT_SUFFIX = ".compact"
+
+def get_project_checkpoint_dir(project_dir: str | None = None, create: bool = False) -> Path:
+    """Get the checkpoint directory for the current project."""
+    checkpoint_dir = Path(project_dir or Path.cwd()) / ".claude" / "checkpoints"
+    if create:
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    return checkpoint_dir
+
+def archive_path(checkpoint_dir: Path, filename: str) -> Path:
+    """The monthly archive a checkpoint file is packed into once it ages out."""
+    return checkpoint_dir / ARCHIVE_DIR / f"{filename[:7]}.zip"
+
+def read_checkpoint(checkpoint_dir: Path, filename: str) -> str:
+    """A checkpoint's markdown, from its file or its archive ("" if neither has it)."""
+    path = checkpoint_dir / filename
+    try:
+        return path.read_text()
+    except FileNotFoundError:
+        pass
+    import zipfile                              # only archived reads pay for it
+    try:
+        with zipfile.ZipFile(archive_path(checkpoint_dir, filename)) as archive:
+            return archive.read(filename).decode()
+    except (FileNotFoundError, KeyError, zipfile.BadZipFile):
+        return ""
+
+@contextmanager
+def locked(checkpoint_dir: Path):
+    """Hold the checkpoint directory's write lock."""
+    with open(checkpoint_dir / LOCK_FILE, "a") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        _finish_compaction(checkpoint_dir)
+        yield                                   # released when f closes
+
+def _compacting(checkpoint_dir: Path, name: str) -> Path:
+    return checkpoint_dir / f".{name}{COMPACT_SUFFIX}"
+
+def _finish_compaction(checkpoint_dir: Path) -> None:
+    """Complete a sidecar compaction a crashed process committed (its new log
+    exists), or discard one it hadn't. Call with the lock held."""
+    log = _compacting(checkpoint_dir, INDEX_FILE)
+    for name in (VECTORS_FILE, BITS_FILE):
+        path = _compacting(checkpoint_dir, name)
+        if path.exists():
+            if log.exists():
+                os.replace(path, checkpoint_dir / name)
+            else:
+                path.unlink()
+    if log.exists():
+        os.replace(log, checkpoint_dir / INDEX_FILE)    # last: the commit point
+
+def _replay(lines) -> dict:
+    index, by_name, records = {"checkpoints": []}, {}, 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue                            # torn final line from a crash
+        records += 1
+        if "meta" in record:
+            index.update(record["meta"])
+        elif record.get("op") == "update":
+            entry = by_name.get(record.pop("filename"))
+            record.pop("op")
+            if entry is not None:
+                entry.update(record)
+        elif record.get("op") == "delete":
+            by_name.pop(record["filename"], None)
+        else:
+            by_name[record["filename"]] = record
+    index["checkpoints"] = list(by_name.values())
+    index["dead_records"] = max(records - len(by_name) - 1, 0)   # one meta line is live
+    return index
+
+def load_index(checkpoint_dir: Path) -> dict:
+    """Load the checkpoint index (or an empty one): {"checkpoints": [...], meta...}."""
+    path = checkpoint_dir / INDEX_FILE
+    if path.exists():
+        with open(path) as f:
+            return _replay(f)
+    legacy = checkpoint_dir / LEGACY_INDEX_FILE
+    if legacy.exists():
+        with open(legacy) as f:
+            index = json.load(f)
+        for entry in index.get("checkpoints", []):
+            entry.pop("embedding", None)        # not converted yet; no vector to offer
+        return index
+    return {"checkpoints": []}
+
+def _write_snapshot(checkpoint_dir: Path, index: dict, path: Path | None = None) -> None:
+    meta = {k: v for k, v in index.items() if k not in ("checkpoints", "dead_records")}
+    path = path or checkpoint_dir / INDEX_FILE
+    tmp = checkpoint_dir / f".{INDEX_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(json.dumps({"meta": meta}) + "\n")
+        for entry in index["checkpoints"]:
+            f.write(json.dumps(entry) + "\n")
+    os.replace(tmp, path)
+
+def _append(checkpoint_dir: Path, records: list[dict]) -> None:
+    with open(checkpoint_dir / INDEX_FILE, "a") as f:
+        f.write("".join(json.dumps(r) + "\n" for r in records))
+
+def _read_meta(checkpoint_dir: Path) -> dict:
+    """The snapshot header's meta, read from the first line only."""
+    path = checkpoint_dir / INDEX_FILE
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        try:
+            return json.loads(f.readline()).get("meta", {})
+        except ValueError:
+            return {}
+
+def index_generation(checkpoint_dir: Path) -> int:
+    """How many times compact_vectors() has renumbered the rows (from the header)."""
+    return _read_meta(checkpoint_dir).get("generation", 0)
+
+def _convert_legacy(checkpoint_dir: Path) -> None:
+    """Turn an index.json (with or without inline embeddings) into the log and
+    sidecar. Call with the lock held."""
+    legacy = checkpoint_dir / LEGACY_INDEX_FILE
+    if not legacy.exists() or (checkpoint_dir / INDEX_FILE).exists():
+        return
+    with open(legacy) as f:
+        index = json.load(f)
+    for entry in index.get("checkpoints", []):
+        vector = entry.pop("embedding", None)
+        if vector is None:
+            continue
+        norm = sum(x * x for x in vector) ** 0.5
+        entry["row"] = _append_vectors(checkpoint_dir, index,
+                                       [[x / norm for x in vector] if norm else vector])
+    _write_snapshot(checkpoint_dir, index)
+    legacy.unlink()
+
+def upgrade_legacy_index(checkpoint_dir: Path) -> None:
+    """Convert an older index.json in place, if there is one."""
+    if (checkpoint_dir / LEGACY_INDEX_FILE).exists():
+        with locked(checkpoint_dir):
+            _convert_legacy(checkpoint_dir)
+
+def _append_vectors(checkpoint_dir: Path, meta: dict, vectors: list[list[float]]) -> int | None:
+    """Append embeddings to the sidecar as consecutive rows; returns the first
+    row, or None if there are none or their size doesn't match the vectors
+    already stored."""
+    if not vectors or not vectors[0]:
+        return None
+    dim = meta.setdefault("embedding_dim", len(vectors[0]))
+    if any(len(vector) != dim for vector in vectors):
+        return None
+    values = array("f")
+    for vector in vectors:
+        values.extend(vector)
+    with open(checkpoint_dir / VECTORS_FILE, "ab") as f:
+        row = f.tell() // (4 * dim)
+        f.truncate(row * 4 * dim)               # drop a torn partial row, if any
+        f.write(values.tobytes())
+    return row
+
+def _prepare(checkpoint_dir: Path, dim: int | None = None) -> dict:
+    """Make sure the log exists, recording the embedding size in its header the
+    first time vectors arrive; returns the header meta. Call with the lock held."""
+    _convert_legacy(checkpoint_dir)
+    meta = _read_meta(checkpoint_dir)
+    if dim and not meta.get("embedding_dim"):
+        index = load_index(checkpoint_dir)
+        index["embedding_dim"] = dim
+        _write_snapshot(checkpoint_dir, index)
+        meta = _read_meta(checkpoint_dir)
+    elif not (checkpoint_dir / INDEX_FILE).exists():
+        _write_snapshot(checkpoint_dir, {"checkpoints": []})
+    return meta
+
+def append_checkpoint(checkpoint_dir: Path, entry: dict, vectors: list[list[float]]) -> dict:
+    """Record a new checkpoint (and its section embeddings) with one append each."""
+    with locked(checkpoint_dir):
+        meta = _prepare(checkpoint_dir, len(vectors[0]) if vectors else None)
+        entry["row"] = _append_vectors(checkpoint_dir, meta, vectors)
+        _append(checkpoint_dir, [entry])
+    return entry
+
+def attach_embeddings(checkpoint_dir: Path, vectors: dict[str, list[list[float]]]) -> int:
+    """Give pending checkpoints their section embeddings: {filename: vectors}.
+    Entries another process already filled in are skipped; returns how many
+    were attached."""
+    vectors = {name: v for name, v in vectors.items() if v}
+    if not vectors:
+        return 0
+    with locked(checkpoint_dir):
+        meta = _prepare(checkpoint_dir, len(next(iter(vectors.values()))[0]))
+        pending = {c["filename"] for c in load_index(checkpoint_dir)["checkpoints"] if c.get("pending")}
+        updates = []
+        for name, rows in vectors.items():
+            row = _append_vectors(checkpoint_dir, meta, rows) if name in pending else None
+            if row is not None:
+                updates.append({"op": "update", "filename": name, "row": row, "pending": False})
+        _append(checkpoint_dir, updates)
+        _compact_if_stale(checkpoint_dir)
+    return len(updates)
+
+def _compact_if_stale(checkpoint_dir: Path, force: bool = False) -> bool:
+    """Rewrite the log as a snapshot if dead lines outnumber live ones (or always,
+    with force). Call with the lock held; returns True if it rewrote."""
+    index = load_index(checkpoint_dir)
+    if not force and index.get("dead_records", 0) <= max(len(index["checkpoints"]), 64):
+        return False
+    _write_snapshot(checkpoint_dir, index)
+    return True
+
+def update_checkpoints(checkpoint_dir: Path, updates: dict[str, dict]) -> None:
+    """Change fields on existing entries: {filename: {field: value}}."""
+    with locked(checkpoint_dir):
+        _convert_legacy(checkpoint_dir)
+        _append(checkpoint_dir, [{"op": "update", "filename": name, **fields}
+                                 for name, fields in updates.items()])
+        _compact_if_stale(checkpoint_dir)
+
+def delete_checkpoints(checkpoint_dir: Path, filenames: list[str]) -> None:
+    """Drop entries from the index (their files are the caller's business)."""
+    with locked(checkpoint_dir):
+        _convert_legacy(checkpoint_dir)
+        _append(checkpoint_dir, [{"op": "delete", "filename": name} for name in filenames])
+        _compact_if_stale(checkpoint_dir)
+
+def compact_index(checkpoint_dir: Path, force: bool = False) -> bool:
+    """Compact the index log now (see _compact_if_stale)."""
+    with locked(checkpoint_dir):
+        _convert_legacy(checkpoint_dir)
+        return _compact_if_stale(checkpoint_dir, force)
+
+def compact_vectors(checkpoint_dir: Path) -> int:
+    """Rewrite embeddings.f32 and embeddings.bits with only the rows live entries
+    own, in row order, renumbering "row" and bumping the index "generation";
+    returns how many rows were dropped. An entry whose rows were never fully
+    written goes back to pending, to be embedded again."""
+    with locked(checkpoint_dir):
+        _convert_legacy(checkpoint_dir)
+        index = load_index(checkpoint_dir)
+        dim = index.get("embedding_dim")
+        path = checkpoint_dir / VECTORS_FILE
+        if not dim or not path.exists():
+            return 0
+        total = path.stat().st_size // (4 * dim)
+        live, torn = [], []
+        for c in index["checkpoints"]:
+            if c.get("row") is not None:
+                count = len(c.get("chunks") or [None])
+                (live if c["row"] + count <= total else torn).append((c["row"], count, c))
+        if not torn and sum(count for _, count, _ in live) == total:
+            return 0
+
+        width = (dim + 7) // 8
+        bits_path = checkpoint_dir / BITS_FILE
+        packed = bits_path.stat().st_size // width if bits_path.exists() else 0
+        row = 0
+        with open(path, "rb") as src, open(_compacting(checkpoint_dir, VECTORS_FILE), "wb") as dst, \
+                open(bits_path if packed else os.devnull, "rb") as bits_src, \
+                open(_compacting(checkpoint_dir, BITS_FILE), "wb") as bits_dst:
+            for first, count, c in sorted(live, key=lambda item: item[0]):
+                src.seek(first * 4 * dim)
+                dst.write(src.read(count * 4 * dim))
+                if row == bits_dst.tell() // width and first + count <= packed:
+                    bits_src.seek(first * width)  # a prefix of packed rows carries over;
+                    bits_dst.write(bits_src.read(count * width))  # search packs the rest
+                c["row"] = row
+                row += count
+        for _, _, c in torn:
+            c.update(row=None, pending=True)
+        index["generation"] = index.get("generation", 0) + 1
+        _write_snapshot(checkpoint_dir, index, _compacting(checkpoint_dir, INDEX_FILE))
+        _finish_compaction(checkpoint_dir)
+    return total - row
+
+def load_vectors(checkpoint_dir: Path, index: dict):
+    """The sidecar as a read-only (rows, dim) float32 memory map, or None."""
+    import numpy as np
+    path = checkpoint_dir / VECTORS_FILE
+    dim = index.get("embedding_dim")
+    if not dim or not path.exists() or path.stat().st_size < 4 * dim:
+        return None
+    rows = path.stat().st_size // (4 * dim)
+    return np.memmap(path, dtype=np.float32, mode="r", shape=(rows, dim))
+
+def record_meta(checkpoint_dir: Path, fields: dict) -> None:
+    """Merge fields into the index meta with one appended line. Call with the lock held."""
+    _append(checkpoint_dir, [{"meta": fields}])
+
+def load_sign_bits(checkpoint_dir: Path, index: dict, vectors):
+    """embeddings.bits as a (rows, dim / 8) uint8 array, after packing any rows of
+    vectors it doesn't have yet, and the mean they were centered on. A bit is
+    set where the row is above the corpus mean ("sign_mean" in the index meta):
+    every embedding shares a large common direction, so raw sign bits mostly
+    agree and Hamming distance barely tracks cosine. The mean is retaken, and
+    every row repacked, once the rows have doubled since it was taken. Call
+    with the lock held."""
+    import numpy as np
+    path = checkpoint_dir / BITS_FILE
+    dim = vectors.shape[1]
+    mean = index.get("sign_mean")
+    if mean is None or len(mean) != dim or len(vectors) > 2 * index.get("sign_mean_rows", 0):
+        total = np.zeros(dim, dtype=np.float64)
+        for start in range(0, len(vectors), 65536):
+            total += vectors[start:start + 65536].sum(axis=0, dtype=np.float64)
+        path.unlink(missing_ok=True)            # packed against the old mean
+        fields = {"sign_mean": (total / len(vectors)).astype(np.float32).tolist(),
+                  "sign_mean_rows": len(vectors)}
+        record_meta(checkpoint_dir, fields)
+        index.update(fields)
+    mean = np.asarray(index["sign_mean"], dtype=np.float32)
+    width = (dim + 7) // 8
+    have = min(path.stat().st_size // width if path.exists() else 0, len(vectors))
+    if have < len(vectors):
+        with open(path, "r+b" if path.exists() else "wb") as f:
+            f.seek(have * width)                # overwrites a torn partial row, if any
+            for start in range(have, len(vectors), 65536):
+                f.write(np.packbits(vectors[start:start + 65536] > mean, axis=1).tobytes())
+    bits = np.fromfile(path, dtype=np.uint8, count=len(vectors) * width).reshape(-1, width)
+    return bits, mean